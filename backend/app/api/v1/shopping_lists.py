@@ -168,23 +168,16 @@ async def delete_shopping_list(
     """Delete a shopping list."""
     try:
         # Verify ownership and delete
-        shopping_list = await shopping_list_service._get_shopping_list(
+        deleted = await shopping_list_service.delete_shopping_list(
             current_user["uid"], list_id
         )
         
-        if not shopping_list:
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Shopping list not found"
             )
         
-        # Delete from database
-        db = shopping_list_service._get_db()
-        if db:
-            db.collection('shopping_lists').document(list_id).delete()
-        else:
-            logger.warning("Database not available - skipping delete operation")
-        
         return SuccessResponse(
             success=True,
             message="Shopping list deleted successfully",
@@ -433,6 +426,7 @@ async def process_ingredients_bulk(
 # Statistics Endpoint
 @router.get("/stats", response_model=SuccessResponse[ShoppingListStatsResponse])
 async def get_shopping_list_stats(
+    include: Optional[str] = Query(None, description="Comma-separated sections to rank: top_categories, top_ingredients, all"),
     current_user: dict = Depends(get_current_user)
 ):
     """Get shopping list statistics for the user."""
@@ -441,7 +435,8 @@ async def get_shopping_list_stats(
         logger.info(f"Getting shopping list statistics for user: {user_id}")
         
         # Get real statistics from the shopping list service
-        stats = await shopping_list_service.get_user_statistics(user_id)
+        sections = {part.strip() for part in include.split(',') if part.strip()} if include else None
+        stats = await shopping_list_service.get_user_statistics(user_id, include=sections)
         
         return SuccessResponse(
             success=True,
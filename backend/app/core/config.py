@@ -27,6 +27,9 @@ class Settings(BaseSettings):
     huggingface_api_key: str = Field(default="", env="HUGGINGFACE_API_KEY")
     mistral_api_key: str = Field(default="ZUIt0gR9H2LgQg7kXDHzMOcocD1c5z3W", env="MISTRAL_API_KEY")
     
+    # Video processing - directory for downloaded videos, system temp dir when empty
+    video_temp_dir: str = Field(default="", env="VIDEO_TEMP_DIR")
+    
     # Instagram/Facebook configuration
     instagram_access_token: str = Field(default="", env="INSTAGRAM_ACCESS_TOKEN")
     facebook_app_access_token: str = Field(default="", env="FACEBOOK_APP_ACCESS_TOKEN")
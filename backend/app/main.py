@@ -6,6 +6,7 @@ from app.api.v1 import recipes, instagram, ai, proxy, multimodal_extraction, sho
 # DISABLED: auth module removed - Firebase handles authentication on frontend
 from app.core.config import settings
 from app.core.database import firebase_service
+from app.services.mistral_service import mistral_service
 from app.schemas.responses import HealthCheckResponse
 import logging
 import time
@@ -16,6 +17,14 @@ from datetime import datetime
 logging.basicConfig(level=settings.log_level.upper())
 logger = logging.getLogger(__name__)
 
+# Encode responses with orjson when available; the stdlib encoder is the fallback
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponseClass
+except ImportError:
+    logger.warning("⚠️ orjson not installed, using standard JSON responses")
+    DefaultResponseClass = JSONResponse
+
 def validate_production_config():
     """Validate that all required configuration is present for production."""
     errors = []
@@ -46,7 +55,8 @@ app = FastAPI(
     version=settings.version,
     description="Recipe Reel Manager API - Save and organize Instagram food recipes with AI",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=DefaultResponseClass
 )
 
 # Add security middleware
@@ -92,6 +102,11 @@ async def startup_event():
         logger.error(f"❌ Failed to start application: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled HTTP connections on shutdown"""
+    await mistral_service.close()
+
 # Include API routers
 app.include_router(
     recipes.router,
@@ -161,12 +161,22 @@ class IngredientItemUpdate(BaseModel):
 
 
 # Statistics Schema
+class CategoryCount(BaseModel):
+    category: str
+    count: int = Field(..., ge=0)
+
+
+class IngredientCount(BaseModel):
+    ingredient: str
+    count: int = Field(..., ge=0)
+
+
 class ShoppingListStatsResponse(BaseModel):
     total_lists: int = Field(..., ge=0)
     active_lists: int = Field(..., ge=0)
     completed_lists: int = Field(..., ge=0)
     total_items: int = Field(..., ge=0)
     average_items_per_list: float = Field(..., ge=0.0)
-    top_categories: List[Dict[str, Any]] = Field(default_factory=list)
-    top_ingredients: List[Dict[str, Any]] = Field(default_factory=list)
+    top_categories: List[CategoryCount] = Field(default_factory=list)
+    top_ingredients: List[IngredientCount] = Field(default_factory=list)
     estimated_savings: float = Field(..., ge=0.0)
\ No newline at end of file
@@ -156,11 +156,42 @@ Extract the recipe data now:
         
         return filtered_data
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client; keeps TLS connections to the API alive between calls"""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=60.0)
+            )
+        return self.client
+    
+    async def generate_text(self, prompt: str, max_tokens: int = 500) -> Optional[Dict[str, Any]]:
+        """Run a plain chat completion and return the raw API response"""
+        try:
+            headers = {
+                "Authorization": f"Bearer {settings.mistral_api_key}",
+                "Content-Type": "application/json"
+            }
+            payload = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens
+            }
+            
+            response = await self._get_client().post(self.api_url, headers=headers, json=payload)
+            if response.status_code == 200:
+                return response.json()
+            
+            logger.error(f"Mistral API error: {response.status_code} - {response.text}")
+            return None
+        except Exception as e:
+            logger.error(f"Mistral text generation failed: {e}")
+            return None
+    
     async def _call_mistral_api(self, prompt: str) -> Optional[Dict[str, Any]]:
         """Call the Mistral AI API"""
         try:
-            if not self.client:
-                self.client = httpx.AsyncClient(timeout=30.0)
+            client = self._get_client()
             
             headers = {
                 "Authorization": f"Bearer {settings.mistral_api_key}",
@@ -182,7 +213,7 @@ Extract the recipe data now:
             
             logger.info(f"🔗 Calling Mistral AI API with model: {self.model}")
             
-            response = await self.client.post(self.api_url, headers=headers, json=payload)
+            response = await client.post(self.api_url, headers=headers, json=payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -328,6 +359,7 @@ Extract the recipe data now:
         """Close HTTP client"""
         if self.client:
             await self.client.aclose()
+            self.client = None
 
 
 # Global instance
@@ -2,10 +2,12 @@ import asyncio
 import httpx
 import logging
 import json
-from typing import Dict, Any, List, Optional, AsyncGenerator
+import re
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, AsyncGenerator, Set
 from datetime import datetime
 import base64
 import io
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
 from app.core.config import settings
@@ -14,8 +16,89 @@ from app.services.audio_processor import production_audio_processor
 from app.services.ai_fusion_service import ai_fusion_service
 from app.services.mistral_service import mistral_service
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Instruction keywords matched as substrings, case-insensitively, in one scan
+_INSTRUCTION_KEYWORDS_RE = re.compile(r'heat|cook|add|mix|stir|bake|fry|boil|season', re.IGNORECASE)
+
+# Time patterns for text extraction, tried in order; the range pattern has three groups
+_COOKING_TIME_PATTERNS = [
+    re.compile(r'(\d+)\s*(minutes?|mins?)'),
+    re.compile(r'(\d+)\s*(hours?|hrs?)'),
+    re.compile(r'(\d+)\s*-\s*(\d+)\s*(minutes?|mins?)'),
+    re.compile(r'cook\s+for\s+(\d+)\s*(minutes?|mins?)'),
+    re.compile(r'bake\s+for\s+(\d+)\s*(minutes?|mins?)')
+]
+
+# Difficulty markers, matched as substrings of lowercased text in a single scan
+_ADVANCED_TECHNIQUES_RE = re.compile(
+    r'tempering|emulsify|clarify|reduction|confit|sous vide|ferment|cure|smoke|braise'
+)
+_SPECIALIST_EQUIPMENT_RE = re.compile(r'stand mixer|food processor|mandoline')
+
+# Visual dishes hinting at quick or slow preparation, matched case-insensitively
+_QUICK_VISUAL_RE = re.compile(r'salad|sandwich|smoothie', re.IGNORECASE)
+_SLOW_VISUAL_RE = re.compile(r'roast|stew|bread', re.IGNORECASE)
+
+_COOKING_TIME_TYPES = frozenset({'cooking_time', 'duration', 'approximate_time'})
+
+def _keyword_alternation(keywords) -> re.Pattern:
+    """Compile keywords into one alternation matched as substrings, longest first"""
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, ordered)))
+
+
+# Keyword tables matched as substrings of lowercased text, so inflected forms
+# ("simmering", "tacos") still count
+_COMPLEXITY_TIME_MODIFIERS = {
+    'quick': -10, 'fast': -10, 'instant': -15,
+    'slow': 30, 'simmer': 20, 'braise': 45, 'roast': 60,
+    'marinade': 15, 'chill': 10, 'rest': 5
+}
+# Lookahead so overlapping indicators are all found in one scan
+_COMPLEXITY_INDICATORS_RE = re.compile(
+    f"(?=({_keyword_alternation(_COMPLEXITY_TIME_MODIFIERS).pattern}))"
+)
+
+_DIETARY_PATTERNS = {
+    diet_type: _keyword_alternation(keywords) for diet_type, keywords in {
+        'vegan': ['vegan', 'plant-based', 'no dairy', 'no meat', 'no animal'],
+        'vegetarian': ['vegetarian', 'veggie', 'no meat', 'meatless'],
+        'gluten-free': ['gluten-free', 'gluten free', 'no gluten', 'celiac'],
+        'dairy-free': ['dairy-free', 'dairy free', 'no dairy', 'lactose-free'],
+        'keto': ['keto', 'ketogenic', 'low-carb', 'low carb'],
+        'paleo': ['paleo', 'paleolithic', 'caveman diet'],
+        'nut-free': ['nut-free', 'nut free', 'no nuts', 'allergy-friendly'],
+        'low-sodium': ['low-sodium', 'low sodium', 'low salt'],
+        'spicy': ['spicy', 'hot', 'chili', 'jalapeño', 'cayenne']
+    }.items()
+}
+
+_CUISINE_PATTERNS = {
+    cuisine: _keyword_alternation(keywords) for cuisine, keywords in {
+        'italian': ['italian', 'pasta', 'pizza', 'risotto'],
+        'mexican': ['mexican', 'taco', 'salsa', 'cilantro'],
+        'asian': ['asian', 'soy sauce', 'ginger', 'sesame'],
+        'mediterranean': ['mediterranean', 'olive oil', 'feta', 'olives'],
+        'indian': ['indian', 'curry', 'turmeric', 'garam masala']
+    }.items()
+}
+
+# Confidence step tables: (minimum value, bonus), highest threshold first
+_VISUAL_INGREDIENT_STEPS = ((4, 0.3), (2, 0.2))
+_VISUAL_OCR_STEPS = ((11, 0.2),)  # more than 10 characters
+_FRAME_COUNT_STEPS = ((6, 0.1), (4, 0.05))
+_FRAME_INGREDIENT_STEPS = ((3, 0.15), (1, 0.1))
+_FRAME_OCR_STEPS = ((21, 0.1),)  # more than 20 characters
+
+
+def _step_bonus(value: int, steps) -> float:
+    """Bonus of the highest threshold reached by value, or 0"""
+    return next((bonus for threshold, bonus in steps if value >= threshold), 0.0)
+
 
 class MultiModalAIService:
     """Enhanced AI service for multi-modal recipe extraction with progressive enhancement"""
@@ -28,6 +111,11 @@ class MultiModalAIService:
             "Authorization": f"Bearer {self.huggingface_api_key}",
             "Content-Type": "application/json"
         }
+        
+        # Frame encoding runs off the event loop; TurboJPEG is used when available
+        self._encode_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="frame-encode")
+        self._jpeg_encoder = None
+        self._jpeg_encoder_loaded = False
     
     async def extract_progressive(
         self,
@@ -239,14 +327,16 @@ class MultiModalAIService:
         """Enhanced text extraction using advanced NLP models"""
         try:
             combined_text = f"{description} {caption}".strip()
+            # Lowercase once; the keyword helpers below all work on this copy
+            combined_text_lower = combined_text.lower()
             
             # Use multiple models for better accuracy
             tasks = [
                 self._extract_ingredients_advanced(combined_text),
                 self._categorize_recipe_advanced(combined_text),
                 self._extract_cooking_instructions_advanced(combined_text),
-                self._extract_cooking_time_advanced(combined_text),
-                self._detect_dietary_info_advanced(combined_text)
+                self._extract_cooking_time_advanced(combined_text_lower),
+                self._detect_dietary_info_advanced(combined_text_lower)
             ]
             
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -269,9 +359,9 @@ class MultiModalAIService:
                 "category": category_result.get("category", "Main Course"),
                 "instructions": instructions,
                 "cookingTime": cooking_time,
-                "difficulty": self._determine_difficulty_advanced(ingredients, cooking_time, combined_text),
+                "difficulty": self._determine_difficulty_advanced(ingredients, cooking_time, combined_text_lower),
                 "dietaryInfo": dietary_info,
-                "tags": self._generate_tags_advanced(ingredients, category_result.get("category"), combined_text),
+                "tags": self._generate_tags_advanced(ingredients, category_result.get("category"), combined_text_lower),
                 "confidence": confidence,
                 "extractedFields": ["ingredients", "category", "instructions", "cookingTime", "difficulty", "dietaryInfo", "tags"]
             }
@@ -336,13 +426,19 @@ class MultiModalAIService:
             all_visual_ingredients = []
             all_ocr_text = []
             
-            for i, frame in enumerate(frames):
+            # Analyze frame compositions, one worker thread per frame
+            compositions = await asyncio.gather(
+                *(asyncio.to_thread(video_processor.analyze_frame_composition, frame) for frame in frames),
+                return_exceptions=True
+            )
+            
+            for i, (frame, composition) in enumerate(zip(frames, compositions)):
                 try:
-                    # Analyze frame composition
-                    composition = video_processor.analyze_frame_composition(frame)
+                    if isinstance(composition, Exception):
+                        raise composition
                     
                     # Convert frame to bytes for processing
-                    frame_bytes = self._frame_to_bytes(frame)
+                    frame_bytes = await self._frame_to_bytes_async(frame)
                     
                     # Detect ingredients in this frame
                     frame_ingredients = await self._detect_ingredients_from_image(frame_bytes)
@@ -711,20 +807,17 @@ class MultiModalAIService:
     def _parse_instructions_from_text(self, text: str) -> str:
         """Parse existing instructions from text"""
         # Look for numbered steps, bullet points, or instruction keywords
-        import re
-        
         # Find numbered steps
         numbered_steps = re.findall(r'\d+\.\s*([^.]+\.)', text)
         if numbered_steps:
             return '\n'.join([f"{i+1}. {step}" for i, step in enumerate(numbered_steps)])
         
         # Look for instruction keywords
-        instruction_keywords = ['heat', 'cook', 'add', 'mix', 'stir', 'bake', 'fry', 'boil', 'season']
         sentences = text.split('.')
         
         instruction_sentences = []
         for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in instruction_keywords):
+            if _INSTRUCTION_KEYWORDS_RE.search(sentence):
                 instruction_sentences.append(sentence.strip())
         
         if instruction_sentences:
@@ -737,82 +830,39 @@ class MultiModalAIService:
         # Fallback instruction generation
         return f"1. Prepare all ingredients as described in the recipe.\n2. Follow the cooking method mentioned in the description.\n3. Season and adjust to taste.\n4. Serve as directed."
     
-    async def _extract_cooking_time_advanced(self, text: str) -> int:
-        """Extract cooking time from text with advanced parsing"""
-        import re
-        
-        # Look for time patterns
-        time_patterns = [
-            r'(\d+)\s*(minutes?|mins?)',
-            r'(\d+)\s*(hours?|hrs?)',
-            r'(\d+)\s*-\s*(\d+)\s*(minutes?|mins?)',
-            r'cook\s+for\s+(\d+)\s*(minutes?|mins?)',
-            r'bake\s+for\s+(\d+)\s*(minutes?|mins?)'
-        ]
-        
-        text_lower = text.lower()
-        
-        for pattern in time_patterns:
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                if len(matches[0]) == 2:  # Single time
-                    time_val, unit = matches[0]
-                    time_val = int(time_val)
-                    if 'hour' in unit:
-                        time_val *= 60
-                    return min(time_val, 240)  # Cap at 4 hours
-                elif len(matches[0]) == 3:  # Range
-                    time_val = int(matches[0][1])  # Take upper bound
-                    unit = matches[0][2]
-                    if 'hour' in unit:
-                        time_val *= 60
-                    return min(time_val, 240)
+    async def _extract_cooking_time_advanced(self, text_lower: str) -> int:
+        """Extract cooking time from already-lowercased text with advanced parsing"""
+        for pattern in _COOKING_TIME_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                groups = match.groups()
+                if len(groups) == 2:  # Single time
+                    time_val, unit = groups
+                else:  # Range, take upper bound
+                    time_val, unit = groups[1], groups[2]
+                time_val = int(time_val)
+                if 'hour' in unit:
+                    time_val *= 60
+                return min(time_val, 240)  # Cap at 4 hours
         
         # Fallback estimation based on complexity
-        return self._estimate_cooking_time_from_complexity(text)
+        return self._estimate_cooking_time_from_complexity(text_lower)
     
-    def _estimate_cooking_time_from_complexity(self, text: str) -> int:
+    def _estimate_cooking_time_from_complexity(self, text_lower: str) -> int:
         """Estimate cooking time based on recipe complexity"""
-        base_time = 25
-        
-        complexity_indicators = {
-            'quick': -10, 'fast': -10, 'instant': -15,
-            'slow': 30, 'simmer': 20, 'braise': 45, 'roast': 60,
-            'marinade': 15, 'chill': 10, 'rest': 5
-        }
-        
-        text_lower = text.lower()
-        for indicator, time_mod in complexity_indicators.items():
-            if indicator in text_lower:
-                base_time += time_mod
+        indicators = set(_COMPLEXITY_INDICATORS_RE.findall(text_lower))
+        base_time = 25 + sum(_COMPLEXITY_TIME_MODIFIERS[indicator] for indicator in indicators)
         
         return max(min(base_time, 240), 5)  # Between 5 and 240 minutes
     
-    async def _detect_dietary_info_advanced(self, text: str) -> List[str]:
+    async def _detect_dietary_info_advanced(self, text_lower: str) -> List[str]:
         """Advanced dietary information detection"""
-        dietary_info = []
-        text_lower = text.lower()
-        
-        # Enhanced dietary detection patterns
-        dietary_patterns = {
-            'vegan': ['vegan', 'plant-based', 'no dairy', 'no meat', 'no animal'],
-            'vegetarian': ['vegetarian', 'veggie', 'no meat', 'meatless'],
-            'gluten-free': ['gluten-free', 'gluten free', 'no gluten', 'celiac'],
-            'dairy-free': ['dairy-free', 'dairy free', 'no dairy', 'lactose-free'],
-            'keto': ['keto', 'ketogenic', 'low-carb', 'low carb'],
-            'paleo': ['paleo', 'paleolithic', 'caveman diet'],
-            'nut-free': ['nut-free', 'nut free', 'no nuts', 'allergy-friendly'],
-            'low-sodium': ['low-sodium', 'low sodium', 'low salt'],
-            'spicy': ['spicy', 'hot', 'chili', 'jalapeño', 'cayenne']
-        }
-        
-        for diet_type, patterns in dietary_patterns.items():
-            if any(pattern in text_lower for pattern in patterns):
-                dietary_info.append(diet_type)
-        
-        return dietary_info
+        return [
+            diet_type for diet_type, pattern in _DIETARY_PATTERNS.items()
+            if pattern.search(text_lower)
+        ]
     
-    def _determine_difficulty_advanced(self, ingredients: List[str], cooking_time: int, text: str) -> str:
+    def _determine_difficulty_advanced(self, ingredients: List[str], cooking_time: int, text_lower: str) -> str:
         """Advanced difficulty determination"""
         difficulty_score = 0
         
@@ -832,19 +882,12 @@ class MultiModalAIService:
         elif cooking_time > 30:
             difficulty_score += 1
         
-        # Technique complexity
-        advanced_techniques = [
-            'tempering', 'emulsify', 'clarify', 'reduction', 'confit',
-            'sous vide', 'ferment', 'cure', 'smoke', 'braise'
-        ]
-        
-        text_lower = text.lower()
-        for technique in advanced_techniques:
-            if technique in text_lower:
-                difficulty_score += 2
+        # Technique complexity, counting each distinct technique once
+        techniques_found = set(_ADVANCED_TECHNIQUES_RE.findall(text_lower))
+        difficulty_score += 2 * len(techniques_found)
         
         # Equipment complexity
-        if any(equip in text_lower for equip in ['stand mixer', 'food processor', 'mandoline']):
+        if _SPECIALIST_EQUIPMENT_RE.search(text_lower):
             difficulty_score += 1
         
         if difficulty_score >= 6:
@@ -854,21 +897,22 @@ class MultiModalAIService:
         else:
             return "Easy"
     
-    def _generate_tags_advanced(self, ingredients: List[str], category: Optional[str], text: str) -> List[str]:
+    def _generate_tags_advanced(self, ingredients: List[str], category: Optional[str], text_lower: str) -> List[str]:
         """Generate comprehensive tags"""
-        tags = []
+        max_tags = 10
+        # Insertion-ordered dict doubles as an ordered set for deduplication
+        tags: Dict[str, None] = {}
         
         # Category-based tags
         if category:
-            tags.append(category.lower().replace(" ", "-"))
+            tags[category.lower().replace(" ", "-")] = None
         
         # Ingredient-based tags (top ingredients)
         for ingredient in ingredients[:4]:
             if len(ingredient) > 2:
-                tags.append(ingredient.replace(" ", "-"))
+                tags[ingredient.replace(" ", "-")] = None
         
         # Cooking method tags
-        text_lower = text.lower()
         methods = {
             'baked': ['bake', 'oven'], 'grilled': ['grill', 'bbq'],
             'fried': ['fry', 'pan-fried'], 'roasted': ['roast'],
@@ -877,29 +921,28 @@ class MultiModalAIService:
         }
         
         for method, keywords in methods.items():
+            if len(tags) >= max_tags:
+                return list(tags)
             if any(keyword in text_lower for keyword in keywords):
-                tags.append(method)
+                tags[method] = None
         
         # Cuisine tags
-        cuisines = {
-            'italian': ['italian', 'pasta', 'pizza', 'risotto'],
-            'mexican': ['mexican', 'taco', 'salsa', 'cilantro'],
-            'asian': ['asian', 'soy sauce', 'ginger', 'sesame'],
-            'mediterranean': ['mediterranean', 'olive oil', 'feta', 'olives'],
-            'indian': ['indian', 'curry', 'turmeric', 'garam masala']
-        }
+        for cuisine, pattern in _CUISINE_PATTERNS.items():
+            if len(tags) >= max_tags:
+                return list(tags)
+            if pattern.search(text_lower):
+                tags[cuisine] = None
         
-        for cuisine, keywords in cuisines.items():
-            if any(keyword in text_lower for keyword in keywords):
-                tags.append(cuisine)
+        if len(tags) >= max_tags:
+            return list(tags)
         
         # Meal timing tags
         if any(word in text_lower for word in ['breakfast', 'brunch']):
-            tags.append('breakfast')
+            tags['breakfast'] = None
         elif any(word in text_lower for word in ['lunch', 'dinner', 'supper']):
-            tags.append('dinner')
+            tags['dinner'] = None
         
-        return list(set(tags))[:10]  # Deduplicate and limit
+        return list(tags)[:max_tags]
     
     async def _extract_text_from_image(self, image_data: bytes) -> str:
         """Extract text from image using OCR"""
@@ -913,61 +956,72 @@ class MultiModalAIService:
     
     def _merge_ingredient_lists(self, text_ingredients: List[str], visual_ingredients: List[str], ocr_text: str) -> List[str]:
         """Intelligently merge ingredient lists from different sources"""
-        merged = list(text_ingredients)
+        max_ingredients = 15  # Limit total ingredients
+        merged = list(text_ingredients[:max_ingredients])
+        if len(merged) >= max_ingredients:
+            return merged
+        
+        # Tokenize each kept ingredient once rather than on every comparison
+        text_tokens = [self._ingredient_tokens(ing) for ing in text_ingredients]
+        merged_tokens = list(text_tokens)
         
         # Add visual ingredients that aren't already covered
         for visual_ing in visual_ingredients:
-            if not any(self._ingredients_similar(visual_ing, text_ing) for text_ing in text_ingredients):
+            visual_tokens = self._ingredient_tokens(visual_ing)
+            if self._tokens_disjoint(visual_tokens, text_tokens):
                 merged.append(visual_ing)
+                merged_tokens.append(visual_tokens)
+                if len(merged) >= max_ingredients:
+                    return merged
         
         # Extract any ingredients mentioned in OCR text
         if ocr_text:
             ocr_ingredients = self._extract_ingredients_fallback(ocr_text)
             for ocr_ing in ocr_ingredients:
-                if not any(self._ingredients_similar(ocr_ing, existing) for existing in merged):
+                ocr_tokens = self._ingredient_tokens(ocr_ing)
+                if self._tokens_disjoint(ocr_tokens, merged_tokens):
                     merged.append(ocr_ing)
+                    merged_tokens.append(ocr_tokens)
+                    if len(merged) >= max_ingredients:
+                        return merged
         
-        return merged[:15]  # Limit total ingredients
+        return merged
     
-    def _ingredients_similar(self, ing1: str, ing2: str) -> bool:
-        """Check if two ingredients are similar"""
-        ing1_words = set(ing1.lower().split())
-        ing2_words = set(ing2.lower().split())
-        
-        # Check for overlap
-        return len(ing1_words.intersection(ing2_words)) > 0
+    def _ingredient_tokens(self, ingredient: str) -> Set[str]:
+        """Lowercased word set used for ingredient similarity"""
+        return set(ingredient.lower().split())
+    
+    def _tokens_disjoint(self, tokens: Set[str], existing_tokens: List[Set[str]]) -> bool:
+        """True if tokens shares no word with any of the existing token sets"""
+        return all(tokens.isdisjoint(existing) for existing in existing_tokens)
     
-    def _estimate_cooking_time_from_visual(self, visual_ingredients: List[str], ocr_text: str) -> Optional[int]:
+    async def _estimate_cooking_time_from_visual(self, visual_ingredients: List[str], ocr_text: str) -> Optional[int]:
         """Estimate cooking time from visual cues"""
         # Look for time mentions in OCR text
         if ocr_text:
-            time_estimate = self._extract_cooking_time_advanced(ocr_text)
+            time_estimate = await self._extract_cooking_time_advanced(ocr_text.lower())
             if time_estimate and time_estimate != 25:  # Not default
                 return time_estimate
         
         # Estimate based on visual ingredients
-        quick_ingredients = ['salad', 'sandwich', 'smoothie']
-        slow_ingredients = ['roast', 'stew', 'bread']
-        
         for ingredient in visual_ingredients:
-            if any(quick in ingredient.lower() for quick in quick_ingredients):
+            if _QUICK_VISUAL_RE.search(ingredient):
                 return 10
-            elif any(slow in ingredient.lower() for slow in slow_ingredients):
+            elif _SLOW_VISUAL_RE.search(ingredient):
                 return 90
         
         return None
     
     def _calculate_visual_confidence(self, visual_ingredients: List[str], ocr_text: str) -> float:
         """Calculate confidence for visual extraction"""
-        confidence = 0.4  # Base confidence
-        
-        if len(visual_ingredients) >= 2:
-            confidence += 0.2
-        if len(visual_ingredients) >= 4:
-            confidence += 0.1
+        ingredient_count = len(visual_ingredients)
+        ocr_len = len(ocr_text or '')
         
-        if ocr_text and len(ocr_text) > 10:
-            confidence += 0.2
+        confidence = (
+            0.4  # Base confidence
+            + _step_bonus(ingredient_count, _VISUAL_INGREDIENT_STEPS)
+            + _step_bonus(ocr_len, _VISUAL_OCR_STEPS)
+        )
         
         return min(confidence, 0.8)
     
@@ -992,33 +1046,54 @@ class MultiModalAIService:
     def _smart_merge_ingredients(self, text_ingredients: List[str], visual_ingredients: List[str], 
                                text_confidence: float, visual_confidence: float) -> List[str]:
         """Smart merging of ingredients based on confidence scores"""
-        merged = []
+        max_ingredients = 12  # Reasonable limit
         
         # Always include high-confidence text ingredients
-        for ingredient in text_ingredients:
-            merged.append(ingredient)
+        merged = list(text_ingredients[:max_ingredients])
+        if len(merged) >= max_ingredients:
+            return merged
         
         # Add visual ingredients if they don't conflict and have decent confidence
         if visual_confidence > 0.4:
+            merged_tokens = [self._ingredient_tokens(ing) for ing in merged]
             for visual_ing in visual_ingredients:
-                if not any(self._ingredients_similar(visual_ing, text_ing) for text_ing in merged):
+                visual_tokens = self._ingredient_tokens(visual_ing)
+                if self._tokens_disjoint(visual_tokens, merged_tokens):
                     merged.append(visual_ing)
+                    merged_tokens.append(visual_tokens)
+                    if len(merged) >= max_ingredients:
+                        return merged
         
-        return merged[:12]  # Reasonable limit
+        return merged
     
     def _parse_ingredients_from_generation(self, result: Any, context_text: str) -> List[str]:
         """Parse ingredients from AI generation result"""
         # Fallback to rule-based if generation fails
         return self._extract_ingredients_fallback(context_text)
     
+    def _get_jpeg_encoder(self):
+        """Load the libjpeg-turbo encoder once, or None if it is not installed"""
+        if not self._jpeg_encoder_loaded:
+            self._jpeg_encoder_loaded = True
+            try:
+                from turbojpeg import TurboJPEG
+                self._jpeg_encoder = TurboJPEG()
+            except (ImportError, OSError) as e:
+                logger.warning(f"TurboJPEG not available, falling back to OpenCV encoding: {e}")
+        return self._jpeg_encoder
+    
     def _frame_to_bytes(self, frame: 'np.ndarray') -> bytes:
         """Convert numpy frame to bytes for processing"""
         try:
+            encoder = self._get_jpeg_encoder()
+            if encoder is not None:
+                from turbojpeg import TJPF_BGR
+                # Video frames arrive in OpenCV's BGR order, which TurboJPEG takes directly
+                return encoder.encode(frame, quality=95, pixel_format=TJPF_BGR)
+            
             import cv2
-            # Convert RGB to BGR for OpenCV
-            frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            # Encode as JPEG
-            success, encoded = cv2.imencode('.jpg', frame_bgr)
+            # Encode as JPEG (frames are already BGR)
+            success, encoded = cv2.imencode('.jpg', frame)
             if success:
                 return encoded.tobytes()
             return b''
@@ -1026,6 +1101,11 @@ class MultiModalAIService:
             logger.error(f"Frame to bytes conversion failed: {e}")
             return b''
     
+    async def _frame_to_bytes_async(self, frame: 'np.ndarray') -> bytes:
+        """Encode a frame on the shared encode pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._encode_pool, self._frame_to_bytes, frame)
+    
     def _calculate_multi_frame_confidence(
         self, 
         frame_analysis: List[Dict], 
@@ -1033,24 +1113,17 @@ class MultiModalAIService:
         ocr_text: str
     ) -> float:
         """Calculate confidence based on multi-frame analysis"""
-        confidence = 0.4  # Base confidence
-        
-        # Boost for number of frames processed
         frames_processed = len(frame_analysis)
-        if frames_processed >= 6:
-            confidence += 0.1
-        elif frames_processed >= 4:
-            confidence += 0.05
+        ingredient_count = len(visual_ingredients)
+        ocr_len = len(ocr_text or '')
         
-        # Boost for visual ingredients found
-        if len(visual_ingredients) >= 3:
-            confidence += 0.15
-        elif len(visual_ingredients) >= 1:
-            confidence += 0.1
-        
-        # Boost for OCR text
-        if ocr_text and len(ocr_text) > 20:
-            confidence += 0.1
+        # Base confidence plus boosts for frames processed, visual ingredients found and OCR text
+        confidence = (
+            0.4
+            + _step_bonus(frames_processed, _FRAME_COUNT_STEPS)
+            + _step_bonus(ingredient_count, _FRAME_INGREDIENT_STEPS)
+            + _step_bonus(ocr_len, _FRAME_OCR_STEPS)
+        )
         
         # Boost for consistent ingredients across frames
         if frames_processed > 1:
@@ -1106,7 +1179,7 @@ class MultiModalAIService:
         cooking_times = []
         
         for indicator in time_indicators:
-            if indicator.get('type') in ['cooking_time', 'duration', 'approximate_time']:
+            if indicator.get('type') in _COOKING_TIME_TYPES:
                 try:
                     value = indicator.get('value', 0)
                     unit = indicator.get('unit', 'minutes')
@@ -1130,15 +1203,22 @@ class MultiModalAIService:
         return cooking_times
     
     async def close(self):
-        """Close HTTP client and processors"""
+        """Close HTTP client and processors concurrently"""
+        closers = [
+            video_processor.close(),
+            production_audio_processor.close(),
+            ai_fusion_service.close(),
+            mistral_service.close()
+        ]
         if self.client:
-            await self.client.aclose()
+            closers.append(self.client.aclose())
+        
+        results = await asyncio.gather(*closers, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error during multimodal service shutdown: {result}")
         
-        # Close processors
-        await video_processor.close()
-        await production_audio_processor.close()
-        await ai_fusion_service.close()
-        await mistral_service.close()
+        self._encode_pool.shutdown(wait=False)
 
 
 # Global instance
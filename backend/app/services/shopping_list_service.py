@@ -1,25 +1,94 @@
+import asyncio
 import logging
-from typing import List, Dict, Optional, Any, Tuple
+import math
+import re
+import time
+from typing import Callable, List, Dict, Optional, Any, Set, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
+from itertools import accumulate
+import numpy as np
 from firebase_admin import firestore
 from app.models.shopping_list import ShoppingList, IngredientItem, Unit, ItemCategory, ShoppingOptimization
 from app.schemas.shopping_list import (
-    ShoppingListCreate, GenerateShoppingListRequest, ShoppingListOptimizationRequest
+    ShoppingListCreate, GenerateShoppingListRequest, ShoppingListOptimizationRequest,
+    ShoppingListStatsResponse, CategoryCount, IngredientCount
 )
 from app.services.ingredient_processor import ingredient_processor
 from app.core.database import firebase_service
 
 logger = logging.getLogger(__name__)
 
+# Unit dimensions for conversion compatibility
+_VOLUME = 0
+_WEIGHT = 1
+
+# Unit -> (dimension, factor to base unit); base units are cups for volume and pounds for weight
+_UNIT_TABLE: Dict[Unit, Tuple[int, float]] = {
+    Unit.CUP: (_VOLUME, 1.0),
+    Unit.CUPS: (_VOLUME, 1.0),
+    Unit.TABLESPOON: (_VOLUME, 1/16),
+    Unit.TABLESPOONS: (_VOLUME, 1/16),
+    Unit.TEASPOON: (_VOLUME, 1/48),
+    Unit.TEASPOONS: (_VOLUME, 1/48),
+    Unit.FLUID_OUNCE: (_VOLUME, 1/8),
+    Unit.FLUID_OUNCES: (_VOLUME, 1/8),
+    Unit.LITER: (_VOLUME, 4.227),
+    Unit.LITERS: (_VOLUME, 4.227),
+    Unit.MILLILITER: (_VOLUME, 0.004227),
+    Unit.MILLILITERS: (_VOLUME, 0.004227),
+    Unit.POUND: (_WEIGHT, 1.0),
+    Unit.POUNDS: (_WEIGHT, 1.0),
+    Unit.OUNCE: (_WEIGHT, 1/16),
+    Unit.OUNCES: (_WEIGHT, 1/16),
+    Unit.GRAM: (_WEIGHT, 0.00220462),
+    Unit.GRAMS: (_WEIGHT, 0.00220462),
+    Unit.KILOGRAM: (_WEIGHT, 2.20462),
+    Unit.KILOGRAMS: (_WEIGHT, 2.20462),
+}
+
+# Simplified seasonal data
+_SEASONAL_PRODUCE = {
+    'spring': ['asparagus', 'peas', 'strawberries', 'artichokes'],
+    'summer': ['tomatoes', 'corn', 'berries', 'zucchini'],
+    'fall': ['apples', 'pumpkin', 'squash', 'cranberries'],
+    'winter': ['citrus', 'root vegetables', 'brussels sprouts', 'cabbage']
+}
+
+# One case-insensitive alternation per season, matched as a substring of the item name
+_SEASONAL_PATTERNS = {
+    season: re.compile('|'.join(map(re.escape, produce)), re.IGNORECASE)
+    for season, produce in _SEASONAL_PRODUCE.items()
+}
+
+# Duplicate groups larger than this are summed with NumPy instead of Python arithmetic
+_VECTORIZE_MIN_GROUP = 32
+
+# How long computed user statistics are served from memory; writes invalidate sooner
+_STATS_TTL_SECONDS = 60
+
+# Rebuilds of a user's stats document retried when list writes keep racing them
+_STATS_REBUILD_ATTEMPTS = 3
+
+# Tallies with more distinct keys than this are ranked in a worker thread
+_THREADED_RANK_MIN_KEYS = 1000
+
+# Console link embedded in Firestore "requires an index" errors
+_INDEX_URL_RE = re.compile(r'https://console\.firebase\.google\.com\S+')
+
 
 class ShoppingListService:
     """Service for managing shopping lists with AI-powered optimization."""
     
+    # Fields left out of persisted shopping list documents (the ID is the document key)
+    _WRITE_EXCLUDE = frozenset({'id'})
+    # Fields that feed the per-user statistics document
+    _STATS_FIELDS = frozenset({'status', 'items'})
+    
     def __init__(self):
         self.db = None
-        self.unit_conversions = self._setup_unit_conversions()
         self.store_layout = self._setup_store_layout()
+        self._stats_cache: Dict[str, Dict[Tuple[bool, bool], Tuple[float, Any]]] = {}
     
     def _get_db(self):
         """Get database connection, initialize if needed."""
@@ -27,34 +96,14 @@ class ShoppingListService:
             self.db = firebase_service.get_db()
         return self.db
     
-    def _setup_unit_conversions(self) -> Dict[str, Dict[str, float]]:
-        """Setup unit conversion factors."""
-        return {
-            'volume': {
-                Unit.CUP: 1.0,
-                Unit.CUPS: 1.0,
-                Unit.TABLESPOON: 1/16,
-                Unit.TABLESPOONS: 1/16,
-                Unit.TEASPOON: 1/48,
-                Unit.TEASPOONS: 1/48,
-                Unit.FLUID_OUNCE: 1/8,
-                Unit.FLUID_OUNCES: 1/8,
-                Unit.LITER: 4.227,
-                Unit.LITERS: 4.227,
-                Unit.MILLILITER: 0.004227,
-                Unit.MILLILITERS: 0.004227,
-            },
-            'weight': {
-                Unit.POUND: 1.0,
-                Unit.POUNDS: 1.0,
-                Unit.OUNCE: 1/16,
-                Unit.OUNCES: 1/16,
-                Unit.GRAM: 0.00220462,
-                Unit.GRAMS: 0.00220462,
-                Unit.KILOGRAM: 2.20462,
-                Unit.KILOGRAMS: 2.20462,
-            }
-        }
+    def _get_all_docs(self, db, refs, field_paths: Optional[List[str]] = None) -> List:
+        """Batch-read document snapshots; blocking, meant to run via asyncio.to_thread."""
+        return list(db.get_all(refs, field_paths=field_paths))
+    
+    async def _count_documents(self, query) -> int:
+        """Count matching documents with a Firestore aggregation query."""
+        result = await asyncio.to_thread(query.count().get)
+        return int(result[0][0].value)
     
     def _setup_store_layout(self) -> Dict[ItemCategory, int]:
         """Setup typical grocery store layout order."""
@@ -75,14 +124,20 @@ class ShoppingListService:
     async def generate_shopping_list(self, user_id: str, request: GenerateShoppingListRequest) -> ShoppingList:
         """Generate a smart shopping list from multiple recipes."""
         try:
-            # Check if shopping lists already exist for any of these recipes
-            existing_lists = await self._check_existing_shopping_lists(user_id, request.recipe_ids)
-            if existing_lists:
+            # Check for existing shopping lists and fetch the recipes concurrently
+            existing_lists, recipes = await asyncio.gather(
+                self._check_existing_shopping_lists(user_id, request.recipe_ids),
+                self._get_recipes(user_id, request.recipe_ids),
+                return_exceptions=True
+            )
+            
+            # The duplicate check takes precedence over recipe lookup errors
+            if existing_lists and not isinstance(existing_lists, Exception):
                 recipe_names = [r['recipe_title'] for r in existing_lists]
                 raise ValueError(f"Shopping lists already exist for: {', '.join(recipe_names)}. Please use the existing lists or delete them first.")
             
-            # Get recipes
-            recipes = await self._get_recipes(user_id, request.recipe_ids)
+            if isinstance(recipes, Exception):
+                raise recipes
             if not recipes:
                 raise ValueError("No valid recipes found")
             
@@ -116,8 +171,9 @@ class ShoppingListService:
             # Optimize categories and ordering
             shopping_items = self._optimize_item_order(shopping_items)
             
-            # Create shopping list
-            list_name = request.list_name or f"Shopping List - {datetime.now().strftime('%m/%d/%Y')}"
+            # Create shopping list; one timestamp covers the default name and both audit fields
+            now = datetime.utcnow()
+            list_name = request.list_name or f"Shopping List - {now:%m/%d/%Y}"
             
             shopping_list = ShoppingList(
                 user_id=user_id,
@@ -127,7 +183,9 @@ class ShoppingListService:
                 total_items=len(shopping_items),
                 checked_items=0,
                 optimization=None,
-                notes=None
+                notes=None,
+                created_at=now,
+                updated_at=now
             )
             
             # Save to database
@@ -143,6 +201,8 @@ class ShoppingListService:
     async def optimize_shopping_list(self, user_id: str, request: ShoppingListOptimizationRequest) -> Dict[str, Any]:
         """Optimize an existing shopping list for efficiency and cost."""
         try:
+            now = datetime.utcnow()
+            
             # Get shopping list
             shopping_list = await self._get_shopping_list(user_id, request.shopping_list_id)
             if not shopping_list:
@@ -156,8 +216,8 @@ class ShoppingListService:
             
             # Update shopping list with optimizations
             shopping_list.items = optimized_items
-            shopping_list.estimated_total = sum(item.estimated_price or 0 for item in optimized_items)
-            shopping_list.updated_at = datetime.utcnow()
+            shopping_list.estimated_total = math.fsum(item.estimated_price for item in optimized_items if item.estimated_price)
+            shopping_list.updated_at = now
             
             # Save updated list
             await self._update_shopping_list(shopping_list)
@@ -188,9 +248,14 @@ class ShoppingListService:
                 logger.error("❌ Database connection not available")
                 raise RuntimeError("Database service is not available")
             
+            # Fetch all requested recipes in a single batched read
+            refs = [db.collection('recipes').document(recipe_id) for recipe_id in recipe_ids]
+            docs = await asyncio.to_thread(self._get_all_docs, db, refs)
+            docs_by_id = {doc.id: doc for doc in docs}
+            
             for recipe_id in recipe_ids:
-                doc = db.collection('recipes').document(recipe_id).get()
-                if doc.exists:
+                doc = docs_by_id.get(recipe_id)
+                if doc is not None and doc.exists:
                     recipe_data = doc.to_dict()
                     if recipe_data.get('userId') == user_id:
                         recipe_data['id'] = doc.id
@@ -221,26 +286,45 @@ class ShoppingListService:
                 return []
             
             # Query shopping lists that contain any of the recipe IDs
-            query = db.collection('shopping_lists').where('user_id', '==', user_id)
-            docs = query.get()
+            query = db.collection('shopping_lists').where('user_id', '==', user_id).select(['recipe_ids', 'name'])
+            docs = await asyncio.to_thread(query.get)
+            
+            requested_ids = set(recipe_ids)
+            overlapping_lists = []
+            all_overlaps = set()
             
             for doc in docs:
                 data = doc.to_dict()
                 list_recipe_ids = data.get('recipe_ids', [])
                 
                 # Check if any of the requested recipe IDs already exist in this list
-                overlapping_recipes = set(recipe_ids) & set(list_recipe_ids)
+                overlapping_recipes = requested_ids & set(list_recipe_ids)
                 if overlapping_recipes:
-                    # Get recipe titles for better error message
-                    for recipe_id in overlapping_recipes:
-                        recipes = await self._get_recipes(user_id, [recipe_id])
-                        if recipes:
-                            existing_lists.append({
-                                'list_id': doc.id,
-                                'list_name': data.get('name', 'Unnamed List'),
-                                'recipe_id': recipe_id,
-                                'recipe_title': recipes[0].get('title', 'Unknown Recipe')
-                            })
+                    overlapping_lists.append((doc.id, data.get('name', 'Unnamed List'), overlapping_recipes))
+                    all_overlaps |= overlapping_recipes
+            
+            if not all_overlaps:
+                return []
+            
+            # Get recipe titles for better error message, in one batched read
+            refs = [db.collection('recipes').document(recipe_id) for recipe_id in all_overlaps]
+            title_map = {}
+            recipe_docs = await asyncio.to_thread(self._get_all_docs, db, refs, ['title', 'userId'])
+            for recipe_doc in recipe_docs:
+                if recipe_doc.exists:
+                    recipe_data = recipe_doc.to_dict()
+                    if recipe_data.get('userId') == user_id:
+                        title_map[recipe_doc.id] = recipe_data.get('title', 'Unknown Recipe')
+            
+            for list_id, list_name, overlapping_recipes in overlapping_lists:
+                for recipe_id in overlapping_recipes:
+                    if recipe_id in title_map:
+                        existing_lists.append({
+                            'list_id': list_id,
+                            'list_name': list_name,
+                            'recipe_id': recipe_id,
+                            'recipe_title': title_map[recipe_id]
+                        })
             
         except Exception as e:
             logger.error(f"Error checking existing shopping lists: {e}")
@@ -251,72 +335,109 @@ class ShoppingListService:
     
     async def _consolidate_ingredients(self, ingredients: List) -> List:
         """Consolidate duplicate ingredients with smart merging."""
-        consolidated = {}
+        # Quantities are staged per entry and summed in base units once at the end
+        consolidated: Dict[Tuple[str, Any], Dict[str, Any]] = {}
         
         for ingredient in ingredients:
-            key = ingredient.name.lower().strip()
-            
-            if key in consolidated:
-                # Merge quantities if units are compatible
-                existing = consolidated[key]
-                if self._units_compatible(existing.unit, ingredient.unit):
-                    # Convert to common unit and add quantities
-                    existing_qty = self._convert_to_base_unit(existing.quantity or 0, existing.unit)
-                    new_qty = self._convert_to_base_unit(ingredient.quantity or 0, ingredient.unit)
-                    total_qty = existing_qty + new_qty
-                    
-                    # Use the more precise unit
-                    better_unit = self._choose_better_unit(existing.unit, ingredient.unit, total_qty)
-                    final_qty = self._convert_from_base_unit(total_qty, better_unit)
-                    
-                    existing.quantity = final_qty
-                    existing.unit = better_unit
-                    
-                    # Merge recipe IDs
-                    if hasattr(ingredient, 'recipe_ids'):
-                        for rid in ingredient.recipe_ids:
-                            if rid not in existing.recipe_ids:
-                                existing.recipe_ids.append(rid)
-                else:
-                    # Keep both if units are incompatible
-                    consolidated[f"{key}_alt"] = ingredient
-            else:
-                consolidated[key] = ingredient
+            # Bucket by name and dimension so volume and weight totals stay separate;
+            # units outside the conversion table only merge with the same unit
+            unit_entry = _UNIT_TABLE.get(ingredient.unit)
+            dimension, factor = unit_entry if unit_entry else (ingredient.unit, 1.0)
+            key = (ingredient.name.lower().strip(), dimension)
+            
+            entry = consolidated.get(key)
+            if entry is None:
+                consolidated[key] = self._new_consolidation_entry(ingredient, factor)
+                continue
+            
+            entry['quantities'].append(ingredient.quantity or 0)
+            entry['factors'].append(factor)
+            entry['units'].append(ingredient.unit)
+            
+            # Merge recipe IDs into an insertion-ordered set
+            entry['recipe_ids'].update(dict.fromkeys(getattr(ingredient, 'recipe_ids', ())))
         
-        return list(consolidated.values())
+        results = []
+        for entry in consolidated.values():
+            ingredient = entry['ingredient']
+            units = entry['units']
+            if len(units) > 1:
+                running = self._running_base_totals(entry['quantities'], entry['factors'])
+                
+                # Use the more precise unit, judged against the total as each item was added
+                unit = units[0]
+                for next_unit, total_qty in zip(units[1:], running[1:]):
+                    unit = self._choose_better_unit(unit, next_unit, total_qty)
+                
+                ingredient.quantity = self._convert_from_base_unit(running[-1], unit)
+                ingredient.unit = unit
+                if hasattr(ingredient, 'recipe_ids'):
+                    ingredient.recipe_ids = list(entry['recipe_ids'])
+            results.append(ingredient)
+        
+        return results
+    
+    def _new_consolidation_entry(self, ingredient, factor: float) -> Dict[str, Any]:
+        """Start a consolidation accumulator for an ingredient."""
+        return {
+            'ingredient': ingredient,
+            'quantities': [ingredient.quantity or 0],
+            'factors': [factor],
+            'units': [ingredient.unit],
+            'recipe_ids': dict.fromkeys(getattr(ingredient, 'recipe_ids', ()))
+        }
+    
+    def _running_base_totals(self, quantities: List[float], factors: List[float]) -> List[float]:
+        """Cumulative base-unit totals; vectorized for large duplicate groups."""
+        if len(quantities) > _VECTORIZE_MIN_GROUP:
+            base = np.asarray(quantities, dtype=np.float64) * np.asarray(factors, dtype=np.float64)
+            return np.cumsum(base).tolist()
+        return list(accumulate(q * f for q, f in zip(quantities, factors)))
     
     
     
     def _optimize_item_order(self, items: List[IngredientItem]) -> List[IngredientItem]:
         """Optimize the order of items based on typical store layout."""
-        return sorted(items, key=lambda item: self.store_layout.get(item.category, 99))
+        # sorted() evaluates the key once per item, so each priority is looked up once
+        priority = self.store_layout.get
+        return sorted(items, key=lambda item: priority(item.category, 99))
     
     async def _generate_optimization(self, shopping_list: ShoppingList, request: ShoppingListOptimizationRequest) -> ShoppingOptimization:
         """Generate optimization recommendations."""
         recommendations = {}
         
+        # Index items by category once; the helpers below read from the buckets
+        buckets = self._bucket_by_category(shopping_list.items)
+        
         # Budget optimization
         if request.budget_priority and shopping_list.budget_limit:
             recommendations['budget'] = await self._optimize_for_budget(shopping_list)
         
         # Time optimization
         if request.time_priority:
-            recommendations['time'] = await self._optimize_for_time(shopping_list)
+            recommendations['time'] = await self._optimize_for_time(buckets)
         
         # Bulk buying recommendations
         if request.include_bulk_recommendations:
-            recommendations['bulk'] = await self._generate_bulk_recommendations(shopping_list)
+            recommendations['bulk'] = await self._generate_bulk_recommendations(buckets)
         
         return ShoppingOptimization(
             user_id=shopping_list.user_id,
             recommendations=recommendations,
-            store_route=self._generate_store_route(shopping_list.items),
-            estimated_time=self._estimate_shopping_time(shopping_list.items),
+            store_route=self._generate_store_route(buckets),
+            estimated_time=self._estimate_shopping_time(buckets),
             cost_savings=self._calculate_potential_savings(shopping_list),
             bulk_opportunities=recommendations.get('bulk', []),
             seasonal_suggestions=await self._get_seasonal_suggestions(shopping_list.items)
         )
     
+    def _bucket_by_category(self, items: List[IngredientItem]) -> Dict[Optional[ItemCategory], List[IngredientItem]]:
+        """Group items by category, keeping categories in first-seen order."""
+        buckets = defaultdict(list)
+        for item in items:
+            buckets[item.category].append(item)
+        return buckets
+    
     async def _optimize_for_budget(self, shopping_list: ShoppingList) -> Dict[str, Any]:
         """Generate budget optimization recommendations."""
         return {
@@ -327,10 +448,10 @@ class ShoppingListService:
             'generic_alternatives': []  # Implement generic brand alternatives
         }
     
-    async def _optimize_for_time(self, shopping_list: ShoppingList) -> Dict[str, Any]:
+    async def _optimize_for_time(self, buckets: Dict[Optional[ItemCategory], List[IngredientItem]]) -> Dict[str, Any]:
         """Generate time optimization recommendations."""
         return {
-            'estimated_time_minutes': self._estimate_shopping_time(shopping_list.items),
+            'estimated_time_minutes': self._estimate_shopping_time(buckets),
             'time_saving_tips': [
                 "Group items by store section",
                 "Shop during off-peak hours",
@@ -339,13 +460,15 @@ class ShoppingListService:
             'optimal_shopping_hours': ['8-10 AM', '2-4 PM', '7-9 PM']
         }
     
-    async def _generate_bulk_recommendations(self, shopping_list: ShoppingList) -> List[Dict[str, Any]]:
+    async def _generate_bulk_recommendations(
+        self, buckets: Dict[Optional[ItemCategory], List[IngredientItem]]
+    ) -> List[Dict[str, Any]]:
         """Generate bulk buying recommendations."""
         bulk_recommendations = []
         
-        for item in shopping_list.items:
-            if item.category in [ItemCategory.PANTRY, ItemCategory.HOUSEHOLD]:
-                # Suggest bulk buying for non-perishables
+        # Suggest bulk buying for non-perishables
+        for category in (ItemCategory.PANTRY, ItemCategory.HOUSEHOLD):
+            for item in buckets.get(category, ()):
                 bulk_recommendations.append({
                     'item': item.name,
                     'current_quantity': item.quantity,
@@ -358,23 +481,18 @@ class ShoppingListService:
         
         return bulk_recommendations[:5]  # Limit to top 5 recommendations
     
-    def _generate_store_route(self, items: List[IngredientItem]) -> List[str]:
+    def _generate_store_route(self, buckets: Dict[Optional[ItemCategory], List[IngredientItem]]) -> List[str]:
         """Generate optimal route through store."""
-        categories = []
-        for item in items:
-            if item.category not in categories:
-                categories.append(item.category)
-        
-        # Sort by store layout
-        sorted_categories = sorted(categories, key=lambda cat: self.store_layout.get(cat, 99))
+        # Bucket keys are the unique categories in first-seen order; sort by store layout
+        sorted_categories = sorted(buckets, key=lambda cat: self.store_layout.get(cat, 99))
         
         return [cat.value for cat in sorted_categories]
     
-    def _estimate_shopping_time(self, items: List[IngredientItem]) -> int:
+    def _estimate_shopping_time(self, buckets: Dict[Optional[ItemCategory], List[IngredientItem]]) -> int:
         """Estimate shopping time in minutes."""
         base_time = 15  # Base time for any shopping trip
-        item_time = len(items) * 2  # 2 minutes per item
-        category_time = len(set(item.category for item in items)) * 3  # 3 minutes per category
+        item_time = sum(len(items) for items in buckets.values()) * 2  # 2 minutes per item
+        category_time = len(buckets) * 3  # 3 minutes per category
         
         return base_time + item_time + category_time
     
@@ -389,67 +507,34 @@ class ShoppingListService:
         current_month = datetime.now().month
         seasonal_items = []
         
-        # Simplified seasonal data
-        seasonal_map = {
-            'spring': ['asparagus', 'peas', 'strawberries', 'artichokes'],
-            'summer': ['tomatoes', 'corn', 'berries', 'zucchini'],
-            'fall': ['apples', 'pumpkin', 'squash', 'cranberries'],
-            'winter': ['citrus', 'root vegetables', 'brussels sprouts', 'cabbage']
-        }
-        
         season = 'spring' if 3 <= current_month <= 5 else \
                 'summer' if 6 <= current_month <= 8 else \
                 'fall' if 9 <= current_month <= 11 else 'winter'
         
-        seasonal_ingredients = seasonal_map.get(season, [])
+        seasonal_pattern = _SEASONAL_PATTERNS[season]
         
         for item in items:
-            for seasonal_item in seasonal_ingredients:
-                if seasonal_item in item.name.lower():
-                    seasonal_items.append({
-                        'item': item.name,
-                        'season': season,
-                        'suggestion': f"{item.name} is in season - great time to buy!",
-                        'expected_savings': '10-30%'
-                    })
-        
-        return seasonal_items[:3]  # Limit to top 3
-    
-    def _units_compatible(self, unit1: Optional[Unit], unit2: Optional[Unit]) -> bool:
-        """Check if two units are compatible for conversion."""
-        if not unit1 or not unit2:
-            return False
-        
-        volume_units = {Unit.CUP, Unit.CUPS, Unit.TABLESPOON, Unit.TABLESPOONS, 
-                       Unit.TEASPOON, Unit.TEASPOONS, Unit.FLUID_OUNCE, Unit.FLUID_OUNCES,
-                       Unit.LITER, Unit.LITERS, Unit.MILLILITER, Unit.MILLILITERS}
-        
-        weight_units = {Unit.POUND, Unit.POUNDS, Unit.OUNCE, Unit.OUNCES,
-                       Unit.GRAM, Unit.GRAMS, Unit.KILOGRAM, Unit.KILOGRAMS}
+            if seasonal_pattern.search(item.name):
+                seasonal_items.append({
+                    'item': item.name,
+                    'season': season,
+                    'suggestion': f"{item.name} is in season - great time to buy!",
+                    'expected_savings': '10-30%'
+                })
+                if len(seasonal_items) >= 3:
+                    break
         
-        return (unit1 in volume_units and unit2 in volume_units) or \
-               (unit1 in weight_units and unit2 in weight_units)
+        return seasonal_items  # Limit to top 3
     
     def _convert_to_base_unit(self, quantity: float, unit: Optional[Unit]) -> float:
         """Convert quantity to base unit (cups for volume, pounds for weight)."""
-        if not unit:
-            return quantity
-        
-        if unit in self.unit_conversions['volume']:
-            return quantity * self.unit_conversions['volume'][unit]
-        elif unit in self.unit_conversions['weight']:
-            return quantity * self.unit_conversions['weight'][unit]
-        
-        return quantity
+        entry = _UNIT_TABLE.get(unit)
+        return quantity * entry[1] if entry else quantity
     
     def _convert_from_base_unit(self, quantity: float, unit: Unit) -> float:
         """Convert from base unit to target unit."""
-        if unit in self.unit_conversions['volume']:
-            return quantity / self.unit_conversions['volume'][unit]
-        elif unit in self.unit_conversions['weight']:
-            return quantity / self.unit_conversions['weight'][unit]
-        
-        return quantity
+        entry = _UNIT_TABLE.get(unit)
+        return quantity / entry[1] if entry else quantity
     
     def _choose_better_unit(self, unit1: Optional[Unit], unit2: Optional[Unit], total_qty: float) -> Unit:
         """Choose the better unit for the total quantity."""
@@ -473,8 +558,13 @@ class ShoppingListService:
                 raise RuntimeError("Database service is not available")
             
             doc_ref = db.collection('shopping_lists').document()
-            shopping_list_dict = shopping_list.dict(exclude={'id'})
-            doc_ref.set(shopping_list_dict)
+            shopping_list_dict = shopping_list.model_dump(exclude=self._WRITE_EXCLUDE)
+            await asyncio.to_thread(
+                self._commit_list_change, db, shopping_list.user_id, doc_ref,
+                shopping_list.model_dump(mode='json', include=self._STATS_FIELDS),
+                lambda transaction: transaction.set(doc_ref, shopping_list_dict)
+            )
+            self.invalidate_user_statistics(shopping_list.user_id)
             logger.info(f"✅ Shopping list saved with ID: {doc_ref.id}")
             return doc_ref.id
         except Exception as e:
@@ -489,7 +579,7 @@ class ShoppingListService:
                 logger.error("❌ Database connection not available")
                 raise RuntimeError("Database service is not available")
             
-            doc = db.collection('shopping_lists').document(list_id).get()
+            doc = await asyncio.to_thread(db.collection('shopping_lists').document(list_id).get)
             if doc.exists:
                 data = doc.to_dict()
                 if data.get('user_id') == user_id:
@@ -515,13 +605,42 @@ class ShoppingListService:
                 raise RuntimeError("Database service is not available")
             
             doc_ref = db.collection('shopping_lists').document(shopping_list.id)
-            shopping_list_dict = shopping_list.dict(exclude={'id'})
-            doc_ref.update(shopping_list_dict)
+            shopping_list_dict = shopping_list.model_dump(exclude=self._WRITE_EXCLUDE)
+            await asyncio.to_thread(
+                self._commit_list_change, db, shopping_list.user_id, doc_ref,
+                shopping_list.model_dump(mode='json', include=self._STATS_FIELDS),
+                lambda transaction: transaction.update(doc_ref, shopping_list_dict)
+            )
+            self.invalidate_user_statistics(shopping_list.user_id)
             logger.info(f"✅ Shopping list updated: {shopping_list.id}")
         except Exception as e:
             logger.error(f"❌ Error updating shopping list: {e}")
             raise
     
+    async def delete_shopping_list(self, user_id: str, list_id: str) -> bool:
+        """Delete a user's shopping list and its stats contribution; False if not found or not owned."""
+        try:
+            db = self._get_db()
+            if not db:
+                logger.error("❌ Database connection not available")
+                raise RuntimeError("Database service is not available")
+            
+            doc_ref = db.collection('shopping_lists').document(list_id)
+            deleted = await asyncio.to_thread(
+                self._commit_list_change, db, user_id, doc_ref, None,
+                lambda transaction: transaction.delete(doc_ref),
+                True
+            )
+            if deleted:
+                self.invalidate_user_statistics(user_id)
+                logger.info(f"✅ Shopping list deleted: {list_id}")
+            else:
+                logger.warning(f"⚠️ Shopping list {list_id} not found for user {user_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"❌ Error deleting shopping list: {e}")
+            raise
+    
     async def get_user_shopping_lists(self, user_id: str, page: int = 1, limit: int = 12, status_filter: Optional[str] = None):
         """Get user's shopping lists with pagination."""
         try:
@@ -539,25 +658,23 @@ class ShoppingListService:
                 if status_filter:
                     query = query.where(filter=firestore.FieldFilter('status', '==', status_filter))
                 
+                # Get total count via an aggregation query, without fetching the documents
+                total = await self._count_documents(query)
+                logger.info(f"📊 Found {total} shopping lists for user {user_id}")
+                
                 # Order by creation date (newest first)
                 # This requires a composite index in Firestore
                 query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
                 
-                # Get total count
-                total_docs = query.get()
-                total = len(total_docs)
-                logger.info(f"📊 Found {total} shopping lists for user {user_id}")
-                
                 # Apply pagination
                 offset = (page - 1) * limit
-                paginated_docs = query.offset(offset).limit(limit).get()
+                paginated_docs = await asyncio.to_thread(query.offset(offset).limit(limit).get)
                 
             except Exception as firestore_error:
                 error_msg = str(firestore_error)
                 if "requires an index" in error_msg and "create it here:" in error_msg:
                     # Extract the URL from the error message
-                    import re
-                    url_match = re.search(r'https://console\.firebase\.google\.com[^\s]+', error_msg)
+                    url_match = _INDEX_URL_RE.search(error_msg)
                     index_url = url_match.group(0) if url_match else "Firebase Console"
                     
                     logger.error(f"🔍 Firestore index required for shopping lists query")
@@ -570,7 +687,7 @@ class ShoppingListService:
                     if status_filter:
                         simple_query = simple_query.where(filter=firestore.FieldFilter('status', '==', status_filter))
                     
-                    total_docs = simple_query.get()
+                    total_docs = await asyncio.to_thread(simple_query.get)
                     total = len(total_docs)
                     
                     # Apply pagination manually
@@ -592,10 +709,9 @@ class ShoppingListService:
                     # Handle case where doc is already a dict (from manual pagination)
                     data = doc
                 
-                # Convert to ShoppingList object to ensure proper structure
-                shopping_list = ShoppingList(**data)
-                shopping_lists.append(shopping_list)
-                logger.info(f"✅ Loaded shopping list: {shopping_list.name}")
+                # Stored documents were validated on write, and the response model validates
+                # them again on the way out, so skip validation here
+                shopping_lists.append(ShoppingList.model_construct(**data))
             
             # Calculate pagination info
             pages = (total + limit - 1) // limit if total > 0 else 1
@@ -619,83 +735,221 @@ class ShoppingListService:
             logger.error(f"❌ Error getting user shopping lists: {e}")
             raise
     
-    async def get_user_statistics(self, user_id: str) -> Dict[str, Any]:
+    async def _compute_user_stats(self, db, user_id: str) -> Dict[str, Any]:
+        """Aggregate a user's shopping lists into the stats document shape."""
+        # List counts are aggregated server-side; item arrays are streamed and tallied in one pass
+        user_lists = db.collection('shopping_lists').where('user_id', '==', user_id)
+        total_lists, active_lists, completed_lists, (total_items, category_counts) = await asyncio.gather(
+            self._count_documents(user_lists),
+            self._count_documents(user_lists.where('status', '==', 'active')),
+            self._count_documents(user_lists.where('status', '==', 'completed')),
+            asyncio.to_thread(self._tally_list_items, user_lists.select(['items']))
+        )
+        
+        return {
+            'total_lists': total_lists,
+            'active_lists': active_lists,
+            'completed_lists': completed_lists,
+            'total_items': total_items,
+            'category_counts': dict(category_counts)
+        }
+    
+    async def _rebuild_user_stats(self, db, user_id: str, stats_ref) -> Dict[str, Any]:
+        """Aggregate a user's stats from scratch and persist them without losing concurrent writes.
+        
+        The document is marked pending first; list writes that land while it is pending flag it
+        dirty instead of incrementing, and the result is only published if no write did.
+        """
+        for _ in range(_STATS_REBUILD_ATTEMPTS):
+            await asyncio.to_thread(stats_ref.set, {'pending': True, 'dirty': False})
+            user_stats = await self._compute_user_stats(db, user_id)
+            if await asyncio.to_thread(self._publish_user_stats, db, stats_ref, user_stats):
+                return user_stats
+        
+        # Still racing writes; serve this snapshot and leave the document pending for the next read
+        logger.warning(f"⚠️ Stats for user {user_id} changed during every rebuild, not persisting")
+        return user_stats
+    
+    def _publish_user_stats(self, db, stats_ref, user_stats: Dict[str, Any]) -> bool:
+        """Replace a pending stats document unless a list write flagged it dirty; blocking."""
+        @firestore.transactional
+        def publish(transaction) -> bool:
+            current = stats_ref.get(field_paths=['pending', 'dirty'], transaction=transaction)
+            state = current.to_dict() if current.exists else None
+            if not state or not state.get('pending') or state.get('dirty'):
+                return False
+            transaction.set(stats_ref, user_stats)
+            return True
+        
+        return publish(db.transaction())
+    
+    def _tally_list_items(self, query) -> Tuple[int, Counter]:
+        """Count items and categories while streaming; blocking."""
+        total_items = 0
+        category_counts = Counter()
+        
+        # Documents are consumed as they arrive instead of being held in a result list
+        for doc in query.stream():
+            items = doc.to_dict().get('items') or ()
+            total_items += len(items)
+            # Manually added items may store category as None
+            category_counts.update(item.get('category') or 'other' for item in items)
+        
+        return total_items, category_counts
+    
+    def _tally_ingredient_names(self, query) -> Counter:
+        """Count lowercased item names while streaming; blocking."""
+        ingredient_counts = Counter()
+        for doc in query.stream():
+            items = doc.to_dict().get('items') or ()
+            ingredient_counts.update(
+                name.lower() for name in (item.get('name') for item in items) if name
+            )
+        return ingredient_counts
+    
+    def _stats_contribution(self, data: Optional[Dict[str, Any]]) -> Counter:
+        """Field-path counts one shopping list adds to its owner's stats document."""
+        counts = Counter()
+        if not data:
+            return counts
+        
+        items = data.get('items') or ()
+        status = data.get('status', 'active')
+        counts['total_lists'] += 1
+        if status in ('active', 'completed'):
+            counts[f'{status}_lists'] += 1
+        counts['total_items'] += len(items)
+        for item in items:
+            counts[('category_counts', item.get('category') or 'other')] += 1
+        return counts
+    
+    def _stats_increments(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Stats document increments for one list going from before to after (None when absent)."""
+        delta = self._stats_contribution(after)
+        delta.subtract(self._stats_contribution(before))
+        return {
+            (firestore.FieldPath(*key).to_api_repr() if isinstance(key, tuple) else key): firestore.Increment(value)
+            for key, value in delta.items() if value
+        }
+    
+    def _commit_list_change(self, db, user_id: str, doc_ref, after: Optional[Dict[str, Any]],
+                            write: Callable[[Any], None], require_owner: bool = False) -> bool:
+        """Apply one list write and its stats increments in a single transaction; blocking.
+        
+        The list's previous state is read inside the transaction, so concurrent writes to the
+        same list are retried rather than computing their deltas from the same snapshot.
+        """
+        stats_ref = db.collection('user_shopping_stats').document(user_id)
+        field_paths = ['user_id', *self._STATS_FIELDS]
+        
+        @firestore.transactional
+        def apply(transaction) -> bool:
+            # Firestore transactions need every read before the first write
+            previous = doc_ref.get(field_paths=field_paths, transaction=transaction)
+            stats = stats_ref.get(field_paths=['pending'], transaction=transaction)
+            before = previous.to_dict() if previous.exists else None
+            if require_owner and (before or {}).get('user_id') != user_id:
+                return False
+            
+            write(transaction)
+            updates = self._stats_increments(before, after)
+            # A missing stats document is aggregated from scratch on the next statistics read;
+            # one being rebuilt is flagged so the rebuild recomputes instead of missing this write
+            if updates and stats.exists:
+                if (stats.to_dict() or {}).get('pending'):
+                    transaction.update(stats_ref, {'dirty': True})
+                else:
+                    transaction.update(stats_ref, updates)
+            return True
+        
+        return apply(db.transaction())
+    
+    async def _most_common(self, counts: Counter, k: int) -> List[Tuple[str, int]]:
+        """Top-k tally entries; large tallies are ranked off the event loop."""
+        if len(counts) > _THREADED_RANK_MIN_KEYS:
+            return await asyncio.to_thread(counts.most_common, k)
+        return counts.most_common(k)
+    
+    def invalidate_user_statistics(self, user_id: str) -> None:
+        """Drop cached statistics after a user's shopping lists change."""
+        self._stats_cache.pop(user_id, None)
+    
+    async def get_user_statistics(self, user_id: str, include: Optional[Set[str]] = None) -> Dict[str, Any]:
         """Get real shopping list statistics for the user."""
+        # include names the ranked sections to compute; None or "all" means both
+        include_all = include is None or 'all' in include
+        variant = (include_all or 'top_categories' in include, include_all or 'top_ingredients' in include)
+        want_categories, want_ingredients = variant
+        
+        cached = self._stats_cache.get(user_id, {}).get(variant)
+        if cached and time.monotonic() - cached[0] < _STATS_TTL_SECONDS:
+            return cached[1]
+        
         try:
             db = self._get_db()
             if not db:
                 logger.error("❌ Database connection not available")
                 raise RuntimeError("Database service is not available")
             
-            # Get all shopping lists for the user
-            query = db.collection('shopping_lists').where('user_id', '==', user_id)
-            docs = query.get()
-            
-            total_lists = len(docs)
-            active_lists = 0
-            completed_lists = 0
-            total_items = 0
-            category_counts = {}
-            ingredient_counts = {}
-            
-            for doc in docs:
-                data = doc.to_dict()
-                status = data.get('status', 'active')
-                
-                if status == 'active':
-                    active_lists += 1
-                elif status == 'completed':
-                    completed_lists += 1
-                
-                # Count items and categories
-                items = data.get('items', [])
-                total_items += len(items)
-                
-                for item in items:
-                    # Count categories
-                    category = item.get('category', 'other')
-                    category_counts[category] = category_counts.get(category, 0) + 1
-                    
-                    # Count ingredient names
-                    name = item.get('name', '').lower()
-                    if name:
-                        ingredient_counts[name] = ingredient_counts.get(name, 0) + 1
-            
-            # Calculate average items per list
-            average_items_per_list = total_items / total_lists if total_lists > 0 else 0.0
-            
-            # Get top categories
+            # Read the denormalized stats document; build and persist it on first use
+            stats_ref = db.collection('user_shopping_stats').document(user_id)
+            stats_doc = await asyncio.to_thread(stats_ref.get)
+            user_stats = stats_doc.to_dict() if stats_doc.exists else None
+            if user_stats is None or user_stats.get('pending'):
+                user_stats = await self._rebuild_user_stats(db, user_id, stats_ref)
+            
+            total_lists = user_stats.get('total_lists', 0)
+            active_lists = user_stats.get('active_lists', 0)
+            completed_lists = user_stats.get('completed_lists', 0)
+            total_items = user_stats.get('total_items', 0)
+            
+            # Decrements can leave zero entries behind; drop them before ranking
+            category_counts = Counter({
+                k: v for k, v in (user_stats.get('category_counts') or {}).items() if v > 0
+            }) if want_categories else Counter()
+            # Distinct names are unbounded, so they are tallied on demand rather than kept in the stats document
+            ingredient_counts = await asyncio.to_thread(
+                self._tally_ingredient_names,
+                db.collection('shopping_lists').where('user_id', '==', user_id).select(['items'])
+            ) if want_ingredients else Counter()
+            
+            # Calculate average items per list to two decimals in integer hundredths (half-up)
+            average_items_per_list = ((total_items * 100 + total_lists // 2) // total_lists) / 100 if total_lists > 0 else 0.0
+            
+            # Rank top categories and ingredients; both run concurrently when large
+            ranked_categories, ranked_ingredients = await asyncio.gather(
+                self._most_common(category_counts, 5),
+                self._most_common(ingredient_counts, 10)
+            )
             top_categories = [
-                {"category": cat, "count": count}
-                for cat, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+                CategoryCount.model_construct(category=cat, count=count)
+                for cat, count in ranked_categories
             ]
-            
-            # Get top ingredients
             top_ingredients = [
-                {"ingredient": ing, "count": count}
-                for ing, count in sorted(ingredient_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+                IngredientCount.model_construct(ingredient=ing, count=count)
+                for ing, count in ranked_ingredients
             ]
             
             # Estimated savings (simplified calculation)
-            estimated_savings = total_lists * 15.0  # Assume $15 savings per list
+            estimated_savings = total_lists * 15  # Assume $15 savings per list
             
-            from app.schemas.shopping_list import ShoppingListStatsResponse
             stats = ShoppingListStatsResponse(
                 total_lists=total_lists,
                 active_lists=active_lists,
                 completed_lists=completed_lists,
                 total_items=total_items,
-                average_items_per_list=round(average_items_per_list, 2),
+                average_items_per_list=average_items_per_list,
                 top_categories=top_categories,
                 top_ingredients=top_ingredients,
                 estimated_savings=estimated_savings
             )
             
-            logger.info(f"📊 Statistics calculated for user {user_id}: {total_lists} lists, {total_items} items")
+            self._stats_cache.setdefault(user_id, {})[variant] = (time.monotonic(), stats)
+            logger.info("📊 Statistics calculated for user %s: %d lists, %d items", user_id, total_lists, total_items)
             return stats
             
         except Exception as e:
-            logger.error(f"❌ Error getting user statistics: {e}")
+            logger.error("❌ Error getting user statistics: %s", e)
             raise
 
 
@@ -1,9 +1,18 @@
 import logging
-import json
-from typing import List, Dict, Optional, Any, Tuple
+import re
+import sys
+from typing import List, Dict, Optional, Any, Tuple, Mapping
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
+from dataclasses import dataclass
+from functools import cache, lru_cache
+from types import MappingProxyType
+from operator import attrgetter
 import asyncio
+import heapq
+import numpy as np
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
 from app.models.shopping_list import ShoppingList, IngredientItem, ItemCategory
 from app.core.database import firebase_service
 from app.services.mistral_service import mistral_service
@@ -11,6 +20,145 @@ from app.services.mistral_service import mistral_service
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class _BulkCandidate:
+    """Slotted record for a bulk-buy candidate; only the top picks become dicts."""
+    idx: int
+    quantity: float
+    bulk_price: float
+    savings: float
+    total_savings: float
+
+
+# Recommendation lists longer than this are summed with NumPy instead of Python arithmetic
+_VECTORIZE_MIN_ENTRIES = 32
+
+# Position of each category in ItemCategory, used to index flattened per-category tables
+_CATEGORY_POSITION = {category: position for position, category in enumerate(ItemCategory)}
+
+# (trend, recommendation) keyed by the sign of predicted minus current price
+_PRICE_TRENDS = {
+    1: ('increasing', 'buy_now'),
+    -1: ('decreasing', 'wait'),
+    0: ('stable', 'neutral')
+}
+
+def _seasonal_record(name: str, price_multiplier: float, availability: str, advantage: str) -> Mapping[str, Any]:
+    """Read-only seasonal produce record with interned string values shared across the table."""
+    return MappingProxyType({
+        'name': sys.intern(name),
+        'price_multiplier': price_multiplier,
+        'availability': sys.intern(availability),
+        'advantage': sys.intern(advantage)
+    })
+
+
+# Raw seasonal produce rows: (name, price_multiplier, availability, advantage); records are built per season on demand
+_SEASONAL_PRODUCE_DATA = {
+    'spring': (
+        ('asparagus', 0.7, 'peak', 'in season, 30% cheaper'),
+        ('strawberries', 0.8, 'peak', 'peak freshness, 20% cheaper'),
+        ('peas', 0.9, 'good', 'fresh and affordable')
+    ),
+    'summer': (
+        ('tomatoes', 0.6, 'peak', 'peak season, 40% cheaper'),
+        ('corn', 0.7, 'peak', 'locally grown, 30% cheaper'),
+        ('berries', 0.8, 'peak', 'fresh and sweet')
+    ),
+    'fall': (
+        ('apples', 0.8, 'peak', 'harvest season, 20% cheaper'),
+        ('squash', 0.7, 'peak', 'locally harvested'),
+        ('cranberries', 0.9, 'peak', 'fresh harvest')
+    ),
+    'winter': (
+        ('citrus', 0.8, 'peak', 'winter season fruit'),
+        ('root vegetables', 0.9, 'good', 'storage crops'),
+        ('brussels sprouts', 0.85, 'good', 'cold weather crop')
+    )
+}
+
+
+@lru_cache(maxsize=len(_SEASONAL_PRODUCE_DATA))
+def _seasonal_tables(season: str) -> Optional[Tuple[Tuple[Mapping[str, Any], ...], re.Pattern]]:
+    """A season's records and the alternation finding their names, built on first use; None for unknown seasons."""
+    rows = _SEASONAL_PRODUCE_DATA.get(season)
+    if rows is None:
+        return None
+    
+    records = tuple(_seasonal_record(*row) for row in rows)
+    pattern = re.compile('|'.join(re.escape(record['name']) for record in records))
+    return records, pattern
+
+
+def _match_seasonal_produce(season: str, name_lower: str) -> Tuple[Mapping[str, Any], ...]:
+    """Seasonal produce whose name contains, or is contained in, the lowercase item name."""
+    tables = _seasonal_tables(season)
+    if tables is None:
+        return ()
+    
+    records, pattern = tables
+    contained = set(pattern.findall(name_lower))
+    return tuple(record for record in records if record['name'] in contained or name_lower in record['name'])
+
+
+_TIME_SAVING_TIPS = (
+    "Group items by store section to minimize backtracking",
+    "Shop during off-peak hours (weekday mornings)",
+    "Use store mobile app for faster checkout",
+    "Prepare shopping list in order of store layout"
+)
+
+_PEAK_HOURS_TO_AVOID = ('saturday_afternoon', 'sunday_afternoon', 'weekday_evening')
+
+_STORAGE_CONSIDERATIONS = MappingProxyType({
+    ItemCategory.FROZEN: "Ensure adequate freezer space",
+    ItemCategory.PRODUCE: "Check refrigerator space and freshness timeline",
+    ItemCategory.PANTRY: "Verify pantry storage and expiration dates",
+    ItemCategory.HOUSEHOLD: "No special storage requirements"
+})
+
+_EXPIRATION_CONSIDERATIONS = MappingProxyType({
+    ItemCategory.FROZEN: "Long shelf life - safe for bulk buying",
+    ItemCategory.PRODUCE: "Short shelf life - buy only what you'll use",
+    ItemCategory.DAIRY_EGGS: "Medium shelf life - check expiration dates",
+    ItemCategory.PANTRY: "Long shelf life - ideal for bulk buying"
+})
+
+_CATEGORY_SHOPPING_TIPS = MappingProxyType({
+    ItemCategory.PRODUCE: (
+        "Shop for produce first to ensure freshness",
+        "Check for seasonal specials and local options"
+    ),
+    ItemCategory.MEAT_SEAFOOD: (
+        "Shop for meat and seafood after produce",
+        "Look for manager's specials near closing time"
+    ),
+    ItemCategory.FROZEN: (
+        "Shop for frozen items last to prevent thawing",
+        "Check for bulk deals on frozen vegetables"
+    ),
+    ItemCategory.PANTRY: (
+        "Stock up on non-perishables when on sale",
+        "Compare unit prices for best value"
+    )
+})
+
+_DEFAULT_SHOPPING_TIPS = ("Compare prices and check expiration dates",)
+
+# Shopping tips indexed by _CATEGORY_POSITION, falling back to the default tips
+_TIPS_BY_POSITION = tuple(_CATEGORY_SHOPPING_TIPS.get(category, _DEFAULT_SHOPPING_TIPS) for category in ItemCategory)
+
+# Leading list markers on LLM output lines: bullets, dashes, asterisks or "1." / "2)" numbering
+_BULLET_RE = re.compile(r'^\s*(?:[•\-\*]+|\d+[\.\)](?=\s))\s*')
+
+_OPTIMAL_SHOPPING_HOURS = (
+    "Weekday mornings (8-10 AM)",
+    "Early weekday afternoons (1-3 PM)",
+    "Late weekday evenings (8-9 PM)",
+    "Early Sunday mornings (8-9 AM)"
+)
+
+
 class ShoppingOptimizer:
     """Advanced ML-powered shopping list optimizer with preference learning."""
     
@@ -53,6 +201,15 @@ class ShoppingOptimizer:
             }
         }
         
+        # Layouts flattened to (priority, aisle) tuples indexed by category position
+        self._store_layouts_fast = {
+            key: (
+                tuple(layout.get(category, {}).get('priority', 999) for category in ItemCategory),
+                tuple(layout.get(category, {}).get('aisle', 0) for category in ItemCategory)
+            )
+            for key, layout in self.store_layouts.items()
+        }
+        
         # Bulk buying thresholds
         self.bulk_thresholds = {
             ItemCategory.PANTRY: {'min_quantity': 2, 'savings_percent': 0.15},
@@ -60,6 +217,16 @@ class ShoppingOptimizer:
             ItemCategory.HOUSEHOLD: {'min_quantity': 2, 'savings_percent': 0.20},
             ItemCategory.SNACKS: {'min_quantity': 3, 'savings_percent': 0.10}
         }
+        
+        # Thresholds as arrays indexed by category position (no threshold = infinite minimum)
+        self._bulk_min_quantity = np.array([
+            self.bulk_thresholds[category]['min_quantity'] if category in self.bulk_thresholds else np.inf
+            for category in ItemCategory
+        ])
+        self._bulk_savings_percent = np.array([
+            self.bulk_thresholds[category]['savings_percent'] if category in self.bulk_thresholds else 0.0
+            for category in ItemCategory
+        ])
     
     def _get_db(self):
         """Get database connection, initialize if needed."""
@@ -74,42 +241,38 @@ class ShoppingOptimizer:
             if preferences is None:
                 preferences = {}
             
+            # Nothing to optimize: skip the profile read, the optimizers and the AI call
+            if not shopping_list.items:
+                return self._empty_optimization_result()
+            
             # Get user preferences and history
             user_profile = await self._get_user_profile(shopping_list.user_id)
             
-            # Run parallel optimization tasks
-            optimization_tasks = [
-                self._optimize_for_cost(shopping_list, user_profile),
-                self._optimize_for_time(shopping_list, user_profile),
-                self._generate_bulk_recommendations(shopping_list, user_profile),
-                self._predict_seasonal_alternatives(shopping_list),
-                self._optimize_store_route(shopping_list, preferences.get('store_preference')),
-                self._predict_price_trends(shopping_list),
-            ]
-            
-            results = await asyncio.gather(*optimization_tasks, return_exceptions=True)
+            # Walk the items once; every optimizer reads from the shared index
+            index = self._build_item_index(shopping_list.items)
+            current_season = self._get_current_season()
             
-            # Combine optimization results
+            # The optimizers are pure CPU work, so they run inline rather than as tasks
             optimization_data = {
-                'cost_optimization': results[0] if not isinstance(results[0], Exception) else {},
-                'time_optimization': results[1] if not isinstance(results[1], Exception) else {},
-                'bulk_recommendations': results[2] if not isinstance(results[2], Exception) else [],
-                'seasonal_alternatives': results[3] if not isinstance(results[3], Exception) else [],
-                'optimized_route': results[4] if not isinstance(results[4], Exception) else [],
-                'price_predictions': results[5] if not isinstance(results[5], Exception) else {},
+                'cost_optimization': self._run_optimizer(self._optimize_for_cost, {}, shopping_list, index, user_profile),
+                'time_optimization': self._run_optimizer(self._optimize_for_time, {}, index, user_profile),
+                'bulk_recommendations': self._run_optimizer(self._generate_bulk_recommendations, [], index, user_profile),
+                'seasonal_alternatives': self._run_optimizer(self._predict_seasonal_alternatives, [], index, current_season),
+                'optimized_route': self._run_optimizer(self._optimize_store_route, [], index, preferences.get('store_preference')),
+                'price_predictions': self._run_optimizer(self._predict_price_trends, {}, index, current_season),
                 'user_preferences': user_profile
             }
             
-            # Generate AI-powered insights
-            ai_insights = await self._generate_ai_insights(shopping_list, optimization_data)
+            # Generate AI-powered insights while updating user preferences based on this shopping list
+            ai_insights, _ = await asyncio.gather(
+                self._generate_ai_insights(shopping_list, index, optimization_data),
+                self._update_user_preferences(shopping_list, index, user_profile)
+            )
             optimization_data['ai_insights'] = ai_insights
             
             # Calculate savings potential
             savings_summary = self._calculate_savings_potential(shopping_list, optimization_data)
             
-            # Update user preferences based on this shopping list
-            await self._update_user_preferences(shopping_list, user_profile)
-            
             return {
                 'optimization_data': optimization_data,
                 'savings_summary': savings_summary,
@@ -120,13 +283,17 @@ class ShoppingOptimizer:
             
         except Exception as e:
             logger.error(f"Error optimizing shopping list: {e}")
-            return {
-                'optimization_data': {},
-                'savings_summary': {'total_savings': 0},
-                'total_estimated_savings': 0,
-                'optimization_score': 0.5,
-                'recommendations': []
-            }
+            return self._empty_optimization_result()
+
+    def _empty_optimization_result(self) -> Dict[str, Any]:
+        """Neutral result for lists that cannot be optimized."""
+        return {
+            'optimization_data': {},
+            'savings_summary': {'total_savings': 0},
+            'total_estimated_savings': 0,
+            'optimization_score': 0.5,
+            'recommendations': []
+        }
 
     async def _get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Get or create user shopping preference profile."""
@@ -137,12 +304,13 @@ class ShoppingOptimizer:
                 logger.warning("Database not available - using default profile")
                 return self._get_default_profile(user_id)
             
-            doc = db.collection('user_shopping_profiles').document(user_id).get()
+            doc = await asyncio.to_thread(db.collection('user_shopping_profiles').document(user_id).get)
             
             if doc.exists:
                 profile = doc.to_dict()
             else:
                 # Create new profile with defaults
+                now_iso = datetime.utcnow().isoformat()
                 profile = {
                     'user_id': user_id,
                     'preferred_stores': [],
@@ -160,12 +328,10 @@ class ShoppingOptimizer:
                     },
                     'brand_preferences': {},  # ingredient_name: preferred_brand
                     'category_priorities': {},  # category: priority_score
-                    'created_at': datetime.utcnow().isoformat(),
-                    'last_updated': datetime.utcnow().isoformat()
+                    'created_at': now_iso,
+                    'last_updated': now_iso
                 }
-                
-                # Save new profile
-                db.collection('user_shopping_profiles').document(user_id).set(profile)
+                # Not saved here: _update_user_preferences creates it at the end of the run
             
             return profile
             
@@ -185,8 +351,51 @@ class ShoppingOptimizer:
             'category_priorities': {}
         }
 
-    async def _optimize_for_cost(self, shopping_list: ShoppingList, 
-                               user_profile: Dict[str, Any]) -> Dict[str, Any]:
+    def _run_optimizer(self, optimizer, default, *args):
+        """Run one optimizer, falling back to ``default`` if it fails."""
+        try:
+            return optimizer(*args)
+        except Exception as e:
+            logger.error(f"Error in {optimizer.__name__}: {e}")
+            return default
+
+    def _build_item_index(self, items: List[IngredientItem]) -> Dict[str, Any]:
+        """Extract the per-item columns the optimizers share in a single pass."""
+        names = []
+        categories = []
+        category_values = []
+        by_category = defaultdict(list)
+        for idx, item in enumerate(items):
+            # Manually added items may have no category
+            category = item.category or ItemCategory.OTHER
+            names.append(item.name)
+            categories.append(category)
+            category_values.append(category.value)
+            by_category[category].append(idx)
+        
+        category_counts = Counter({category: len(indices) for category, indices in by_category.items()})
+        category_positions = np.fromiter((_CATEGORY_POSITION[c] for c in categories), dtype=np.intp, count=len(categories))
+        
+        prices = np.fromiter((item.estimated_price or 0.0 for item in items), dtype=np.float64, count=len(items))
+        quantities = np.fromiter((item.quantity or 0.0 for item in items), dtype=np.float64, count=len(items))
+        
+        # Items over $10, in list order
+        expensive = np.flatnonzero(prices > 10)
+        
+        return {
+            'names': names,
+            'categories': categories,
+            'category_values': category_values,
+            'category_positions': category_positions,
+            'prices': prices,
+            'quantities': quantities,
+            'by_category': by_category,
+            'category_counts': category_counts,
+            'expensive': expensive
+        }
+
+    def _optimize_for_cost(self, shopping_list: ShoppingList, index: Dict[str, Any],
+                         user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize shopping list for cost savings."""
         total_estimated = shopping_list.estimated_total or 0
         budget_limit = shopping_list.budget_limit or user_profile.get('budget_preferences', {}).get('average_weekly_budget', 150)
@@ -201,66 +410,63 @@ class ShoppingOptimizer:
             'price_comparison_opportunities': []
         }
         
-        # Analyze expensive items
-        expensive_items = sorted(
-            [item for item in shopping_list.items if item.estimated_price and item.estimated_price > 10],
-            key=lambda x: x.estimated_price or 0,
-            reverse=True
-        )
+        names = index['names']
+        prices = index['prices']
         
-        for item in expensive_items[:5]:  # Top 5 expensive items
+        # Analyze expensive items
+        for idx in heapq.nlargest(5, index['expensive'], key=prices.__getitem__):  # Top 5 expensive items
+            name = names[idx]
+            price = float(prices[idx])
             optimization['cost_reduction_suggestions'].append({
-                'item': item.name,
-                'current_price': item.estimated_price,
-                'suggestion': f"Consider generic brand for {item.name}",
-                'potential_savings': (item.estimated_price or 0) * 0.3,  # 30% savings with generic
-                'alternative': f"Generic {item.name.lower()}"
+                'item': name,
+                'current_price': price,
+                'suggestion': f"Consider generic brand for {name}",
+                'potential_savings': price * 0.3,  # 30% savings with generic
+                'alternative': f"Generic {name.lower()}"
             })
         
         # Suggest store brands for categories with high markup
+        by_category = index['by_category']
         high_markup_categories = [ItemCategory.SNACKS, ItemCategory.HOUSEHOLD, ItemCategory.BEVERAGES]
-        for item in shopping_list.items:
-            if item.category in high_markup_categories and item.estimated_price and item.estimated_price > 5:
+        markup_indices = sorted(idx for category in high_markup_categories for idx in by_category.get(category, ()))
+        for idx in markup_indices:
+            price = float(prices[idx])
+            if price > 5:
                 optimization['generic_alternatives'].append({
-                    'item': item.name,
-                    'category': item.category.value,
-                    'current_price': item.estimated_price,
-                    'generic_price': item.estimated_price * 0.7,  # 30% savings
-                    'savings': item.estimated_price * 0.3
+                    'item': names[idx],
+                    'category': index['category_values'][idx],
+                    'current_price': price,
+                    'generic_price': price * 0.7,  # 30% savings
+                    'savings': price * 0.3
                 })
         
         return optimization
 
-    async def _optimize_for_time(self, shopping_list: ShoppingList, 
-                               user_profile: Dict[str, Any]) -> Dict[str, Any]:
+    def _optimize_for_time(self, index: Dict[str, Any],
+                         user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize shopping list for time efficiency."""
         patterns = user_profile.get('shopping_patterns', {})
         
         # Calculate estimated shopping time
         base_time = 20  # Base shopping time
-        item_time = len(shopping_list.items) * 1.5  # 1.5 minutes per item
-        category_changes = len(set(item.category for item in shopping_list.items)) * 2  # 2 minutes per category change
+        item_time = len(index['names']) * 1.5  # 1.5 minutes per item
+        category_changes = len(index['by_category']) * 2  # 2 minutes per category change
         
         estimated_time = base_time + item_time + category_changes
         
         optimization = {
             'estimated_shopping_time': estimated_time,
             'optimal_shopping_hours': self._get_optimal_shopping_hours(),
-            'time_saving_tips': [
-                "Group items by store section to minimize backtracking",
-                "Shop during off-peak hours (weekday mornings)",
-                "Use store mobile app for faster checkout",
-                "Prepare shopping list in order of store layout"
-            ],
+            'time_saving_tips': _TIME_SAVING_TIPS,
             'efficiency_score': max(0, min(100, 100 - (estimated_time - 30) * 2)),  # Score based on time
-            'category_organization': self._optimize_category_order(shopping_list.items),
-            'peak_hours_to_avoid': ['saturday_afternoon', 'sunday_afternoon', 'weekday_evening']
+            'category_organization': self._optimize_category_order(index['category_counts']),
+            'peak_hours_to_avoid': _PEAK_HOURS_TO_AVOID
         }
         
         return optimization
 
-    async def _generate_bulk_recommendations(self, shopping_list: ShoppingList,
-                                           user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _generate_bulk_recommendations(self, index: Dict[str, Any],
+                                     user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate bulk buying recommendations."""
         bulk_recommendations = []
         
@@ -269,116 +475,144 @@ class ShoppingOptimizer:
         if not bulk_preference:
             return bulk_recommendations
         
-        for item in shopping_list.items:
-            threshold = self.bulk_thresholds.get(item.category)
-            if not threshold or not item.estimated_price:
-                continue
-            
-            if item.quantity and item.quantity >= threshold['min_quantity']:
-                savings_percent = threshold['savings_percent']
-                bulk_price = item.estimated_price * (1 - savings_percent)
-                savings = item.estimated_price - bulk_price
-                
-                bulk_recommendations.append({
-                    'item': item.name,
-                    'category': item.category.value,
-                    'current_quantity': item.quantity,
-                    'bulk_quantity': item.quantity * 2,  # Suggest doubling
-                    'current_price': item.estimated_price,
-                    'bulk_price_per_unit': bulk_price / item.quantity,
-                    'total_bulk_price': bulk_price * 2,
-                    'savings_per_unit': savings,
-                    'total_savings': savings * 2,
-                    'recommendation': f"Buy 2x {item.name} in bulk to save ${savings * 2:.2f}",
-                    'storage_consideration': self._get_storage_consideration(item.category),
-                    'expiration_consideration': self._get_expiration_consideration(item.category)
-                })
+        names = index['names']
+        categories = index['categories']
+        category_values = index['category_values']
+        prices = index['prices']
+        quantities = index['quantities']
+        
+        # Only items in categories with a bulk threshold are candidates (kept in list order)
+        by_category = index['by_category']
+        candidates = np.array(
+            sorted(idx for category in self.bulk_thresholds for idx in by_category.get(category, ())),
+            dtype=np.intp
+        )
+        if not candidates.size:
+            return bulk_recommendations
         
-        # Sort by potential savings
-        bulk_recommendations.sort(key=lambda x: x['total_savings'], reverse=True)
+        # Price math for all candidates at once
+        positions = index['category_positions'][candidates]
+        candidate_prices = prices[candidates]
+        bulk_prices = candidate_prices * (1 - self._bulk_savings_percent[positions])
+        savings_per_unit = candidate_prices - bulk_prices
+        eligible = np.flatnonzero((candidate_prices > 0) & (quantities[candidates] >= self._bulk_min_quantity[positions]))
+        
+        candidates_found = [
+            _BulkCandidate(int(candidates[pos]), float(quantities[candidates[pos]]),
+                           float(bulk_prices[pos]), float(savings_per_unit[pos]),
+                           float(savings_per_unit[pos]) * 2)
+            for pos in eligible
+        ]
         
-        return bulk_recommendations[:5]  # Top 5 recommendations
+        # Top 5 recommendations by potential savings; only these are expanded into response dicts
+        for candidate in heapq.nlargest(5, candidates_found, key=attrgetter('total_savings')):
+            idx = candidate.idx
+            name = names[idx]
+            category = categories[idx]
+            quantity = candidate.quantity
+            bulk_price = candidate.bulk_price
+            savings = candidate.savings
+            
+            bulk_recommendations.append({
+                'item': name,
+                'category': category_values[idx],
+                'current_quantity': quantity,
+                'bulk_quantity': quantity * 2,  # Suggest doubling
+                'current_price': float(prices[idx]),
+                'bulk_price_per_unit': bulk_price / quantity,
+                'total_bulk_price': bulk_price * 2,
+                'savings_per_unit': savings,
+                'total_savings': candidate.total_savings,
+                'recommendation': f"Buy 2x {name} in bulk to save ${candidate.total_savings:.2f}",
+                'storage_consideration': self._get_storage_consideration(category),
+                'expiration_consideration': self._get_expiration_consideration(category)
+            })
+        
+        return bulk_recommendations
 
-    async def _predict_seasonal_alternatives(self, shopping_list: ShoppingList) -> List[Dict[str, Any]]:
+    def _predict_seasonal_alternatives(self, index: Dict[str, Any], current_season: str) -> List[Dict[str, Any]]:
         """Predict seasonal alternatives for better pricing."""
-        current_season = self._get_current_season()
         seasonal_alternatives = []
+        names = index['names']
+        produce = index['by_category'].get(ItemCategory.PRODUCE, ())
         
-        for item in shopping_list.items:
-            if item.category == ItemCategory.PRODUCE:
-                alternatives = self._get_seasonal_produce_alternatives(item.name, current_season)
-                
-                if alternatives:
-                    for alt in alternatives:
-                        seasonal_alternatives.append({
-                            'original_item': item.name,
-                            'alternative': alt['name'],
-                            'season': current_season,
-                            'price_advantage': alt['price_multiplier'],
-                            'availability': alt['availability'],
-                            'suggestion': f"Consider {alt['name']} instead of {item.name} - {alt['advantage']}"
-                        })
+        for idx in produce:
+            name = names[idx]
+            alternatives = self._get_seasonal_produce_alternatives(name, current_season)
+            
+            if alternatives:
+                for alt in alternatives:
+                    seasonal_alternatives.append({
+                        'original_item': name,
+                        'alternative': alt['name'],
+                        'season': current_season,
+                        'price_advantage': alt['price_multiplier'],
+                        'availability': alt['availability'],
+                        'suggestion': f"Consider {alt['name']} instead of {name} - {alt['advantage']}"
+                    })
         
         return seasonal_alternatives
 
-    async def _optimize_store_route(self, shopping_list: ShoppingList, 
-                                  store_preference: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _optimize_store_route(self, index: Dict[str, Any],
+                            store_preference: Optional[str] = None) -> List[Dict[str, Any]]:
         """Optimize route through store based on layout."""
         store_key = store_preference.lower().replace(' ', '_') if store_preference else 'default'
-        store_layout = self.store_layouts.get(store_key, self.store_layouts['default'])
+        priorities, aisles = self._store_layouts_fast.get(store_key, self._store_layouts_fast['default'])
         
-        # Group items by category and sort by store layout
-        category_groups = defaultdict(list)
-        for item in shopping_list.items:
-            category_groups[item.category].append(item)
+        # Items are already grouped by category in the index
+        category_groups = index['by_category']
+        names = index['names']
         
         # Sort categories by store layout priority
         sorted_categories = sorted(
             category_groups.keys(),
-            key=lambda cat: store_layout.get(cat, {}).get('priority', 999)
+            key=lambda cat: priorities[_CATEGORY_POSITION[cat]]
         )
         
         route = []
         for category in sorted_categories:
             items = category_groups[category]
-            layout_info = store_layout.get(category, {'aisle': 0, 'priority': 999})
+            position = _CATEGORY_POSITION[category]
             
             route.append({
                 'step': len(route) + 1,
                 'category': category.value,
-                'aisle': layout_info.get('aisle', 0),
-                'items': [item.name for item in items],
+                'aisle': aisles[position],
+                'items': [names[idx] for idx in items],
                 'item_count': len(items),
                 'estimated_time': len(items) * 1.5 + 2,  # 1.5 min per item + 2 min category setup
-                'tips': self._get_category_shopping_tips(category)
+                'tips': _TIPS_BY_POSITION[position]
             })
         
         return route
 
-    async def _predict_price_trends(self, shopping_list: ShoppingList) -> Dict[str, Any]:
+    def _predict_price_trends(self, index: Dict[str, Any], current_season: str) -> Dict[str, Any]:
         """Predict price trends for items in the shopping list."""
-        current_season = self._get_current_season()
         price_predictions = {}
-        
-        for item in shopping_list.items:
-            if not item.estimated_price:
-                continue
-            
-            category_multiplier = self.seasonal_price_multipliers.get(current_season, {}).get(item.category.value, 1.0)
-            predicted_price = item.estimated_price * category_multiplier
-            
-            price_predictions[item.name] = {
-                'current_price': item.estimated_price,
-                'predicted_price': predicted_price,
-                'trend': 'increasing' if predicted_price > item.estimated_price else 'decreasing' if predicted_price < item.estimated_price else 'stable',
+        names = index['names']
+        prices = index['prices']
+        
+        # Per-category seasonal multipliers, broadcast to every item in one step
+        season_table = self.seasonal_price_multipliers.get(current_season, {})
+        multiplier_table = np.array([season_table.get(category.value, 1.0) for category in ItemCategory])
+        multipliers = multiplier_table[index['category_positions']]
+        predicted = prices * multipliers
+        directions = np.sign(predicted - prices).astype(int)
+        
+        for idx in np.flatnonzero(prices):
+            trend, recommendation = _PRICE_TRENDS[directions[idx]]
+            price_predictions[names[idx]] = {
+                'current_price': float(prices[idx]),
+                'predicted_price': float(predicted[idx]),
+                'trend': trend,
                 'confidence': 0.7,  # Simplified confidence score
-                'season_factor': category_multiplier,
-                'recommendation': 'buy_now' if predicted_price > item.estimated_price else 'wait' if predicted_price < item.estimated_price else 'neutral'
+                'season_factor': float(multipliers[idx]),
+                'recommendation': recommendation
             }
         
         return price_predictions
 
-    async def _generate_ai_insights(self, shopping_list: ShoppingList, 
+    async def _generate_ai_insights(self, shopping_list: ShoppingList, index: Dict[str, Any],
                                   optimization_data: Dict[str, Any]) -> List[str]:
         """Generate AI-powered insights using Mistral."""
         try:
@@ -387,7 +621,7 @@ class ShoppingOptimizer:
                 'total_items': shopping_list.total_items,
                 'estimated_total': shopping_list.estimated_total,
                 'budget_limit': shopping_list.budget_limit,
-                'categories': list(set(item.category.value for item in shopping_list.items)),
+                'categories': [category.value for category in index['by_category']],
                 'optimization_summary': {
                     'cost_savings': optimization_data.get('cost_optimization', {}).get('cost_reduction_suggestions', []),
                     'bulk_opportunities': len(optimization_data.get('bulk_recommendations', [])),
@@ -417,9 +651,9 @@ class ShoppingOptimizer:
                 insights_text = response['choices'][0]['message']['content']
                 # Split into individual insights (assuming they're separated by bullet points or newlines)
                 insights = [
-                    insight.strip().lstrip('•-*').strip() 
-                    for insight in insights_text.split('\n') 
-                    if insight.strip() and len(insight.strip()) > 20
+                    _BULLET_RE.sub('', line).strip()
+                    for line in insights_text.splitlines()
+                    if len(line.strip()) > 20
                 ]
                 return insights[:5]  # Limit to 5 insights
             
@@ -443,20 +677,11 @@ class ShoppingOptimizer:
         
         # Cost optimization savings
         cost_opt = optimization_data.get('cost_optimization', {})
-        cost_savings = sum(
-            item.get('potential_savings', 0) 
-            for item in cost_opt.get('cost_reduction_suggestions', [])
-        )
-        generic_savings = sum(
-            item.get('savings', 0) 
-            for item in cost_opt.get('generic_alternatives', [])
-        )
+        cost_savings = self._sum_field(cost_opt.get('cost_reduction_suggestions', []), 'potential_savings')
+        generic_savings = self._sum_field(cost_opt.get('generic_alternatives', []), 'savings')
         
         # Bulk buying savings
-        bulk_savings = sum(
-            item.get('total_savings', 0) 
-            for item in optimization_data.get('bulk_recommendations', [])
-        )
+        bulk_savings = self._sum_field(optimization_data.get('bulk_recommendations', []), 'total_savings')
         
         total_savings = cost_savings + generic_savings + bulk_savings
         
@@ -470,32 +695,32 @@ class ShoppingOptimizer:
         
         return savings_breakdown
 
+    def _sum_field(self, entries: List[Dict[str, Any]], field: str) -> float:
+        """Sum one numeric field across recommendation entries; vectorized for long lists."""
+        if len(entries) > _VECTORIZE_MIN_ENTRIES:
+            return float(np.fromiter((entry.get(field, 0) for entry in entries), dtype=np.float64, count=len(entries)).sum())
+        return float(sum(entry.get(field, 0) for entry in entries))
+
     def _calculate_optimization_score(self, optimization_data: Dict[str, Any]) -> float:
         """Calculate overall optimization score (0-1)."""
-        scores = []
-        
         # Cost optimization score
         cost_opt = optimization_data.get('cost_optimization', {})
         budget_utilization = cost_opt.get('budget_utilization', 100)
-        cost_score = max(0, min(1, 1 - (budget_utilization - 80) / 40))  # Ideal is 80% budget utilization
-        scores.append(cost_score)
+        cost_score = min(1.0, max(0.0, 1.0 - (budget_utilization - 80.0) * 0.025))  # Ideal is 80% budget utilization
         
         # Time optimization score
         time_opt = optimization_data.get('time_optimization', {})
-        efficiency_score = time_opt.get('efficiency_score', 50) / 100
-        scores.append(efficiency_score)
+        efficiency_score = time_opt.get('efficiency_score', 50) * 0.01
         
         # Bulk opportunities score
         bulk_count = len(optimization_data.get('bulk_recommendations', []))
-        bulk_score = min(1, bulk_count / 3)  # Ideal is 3+ bulk opportunities
-        scores.append(bulk_score)
+        bulk_score = min(1.0, bulk_count / 3)  # Ideal is 3+ bulk opportunities
         
         # Seasonal alternatives score
         seasonal_count = len(optimization_data.get('seasonal_alternatives', []))
-        seasonal_score = min(1, seasonal_count / 2)  # Ideal is 2+ seasonal alternatives
-        scores.append(seasonal_score)
+        seasonal_score = min(1.0, seasonal_count * 0.5)  # Ideal is 2+ seasonal alternatives
         
-        return sum(scores) / len(scores) if scores else 0.5
+        return (cost_score + efficiency_score + bulk_score + seasonal_score) * 0.25
 
     def _generate_actionable_recommendations(self, optimization_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate prioritized, actionable recommendations."""
@@ -534,30 +759,38 @@ class ShoppingOptimizer:
                 'effort': 'low'
             })
         
-        # Sort by priority
+        # Top 6 recommendations by priority
         priority_order = {'high': 3, 'medium': 2, 'low': 1}
-        recommendations.sort(key=lambda x: priority_order.get(x['priority'], 0), reverse=True)
-        
-        return recommendations[:6]  # Top 6 recommendations
+        return heapq.nlargest(6, recommendations, key=lambda x: priority_order.get(x['priority'], 0))
 
-    async def _update_user_preferences(self, shopping_list: ShoppingList, 
+    async def _update_user_preferences(self, shopping_list: ShoppingList, index: Dict[str, Any],
                                      user_profile: Dict[str, Any]) -> None:
         """Update user preferences based on shopping behavior."""
         try:
             # Update category priorities based on frequency
-            category_counts = Counter(item.category.value for item in shopping_list.items)
-            for category, count in category_counts.items():
-                current_priority = user_profile.get('category_priorities', {}).get(category, 0)
-                user_profile.setdefault('category_priorities', {})[category] = current_priority + count
+            now_iso = datetime.utcnow().isoformat()
+            updates = {
+                'shopping_patterns.last_shopping_date': now_iso,
+                'last_updated': now_iso
+            }
+            category_priorities = user_profile.setdefault('category_priorities', {})
+            for category, count in index['category_counts'].items():
+                category_value = category.value
+                category_priorities[category_value] = category_priorities.get(category_value, 0) + count
+                updates[f'category_priorities.{category_value}'] = firestore.Increment(count)
             
-            # Update shopping patterns
-            user_profile.setdefault('shopping_patterns', {})['last_shopping_date'] = datetime.utcnow().isoformat()
-            user_profile['last_updated'] = datetime.utcnow().isoformat()
+            # Mirror the changes locally in case the profile has to be created from scratch
+            user_profile.setdefault('shopping_patterns', {})['last_shopping_date'] = now_iso
+            user_profile['last_updated'] = now_iso
             
-            # Save updated profile
+            # Save only the changed fields; first-time profiles are written in full
             db = self._get_db()
             if db:
-                db.collection('user_shopping_profiles').document(shopping_list.user_id).set(user_profile)
+                profile_ref = db.collection('user_shopping_profiles').document(shopping_list.user_id)
+                try:
+                    await asyncio.to_thread(profile_ref.update, updates)
+                except NotFound:
+                    await asyncio.to_thread(profile_ref.set, user_profile)
             else:
                 logger.warning("Database not available - skipping profile update")
             
@@ -577,98 +810,36 @@ class ShoppingOptimizer:
         else:
             return 'winter'
 
-    def _get_optimal_shopping_hours(self) -> List[str]:
+    def _get_optimal_shopping_hours(self) -> Tuple[str, ...]:
         """Get optimal shopping hours to avoid crowds."""
-        return [
-            "Weekday mornings (8-10 AM)",
-            "Early weekday afternoons (1-3 PM)",
-            "Late weekday evenings (8-9 PM)",
-            "Early Sunday mornings (8-9 AM)"
-        ]
+        return _OPTIMAL_SHOPPING_HOURS
 
-    def _optimize_category_order(self, items: List[IngredientItem]) -> List[str]:
+    def _optimize_category_order(self, category_counts: Counter) -> List[str]:
         """Optimize the order of categories for efficient shopping."""
-        category_counts = Counter(item.category for item in items)
         # Sort by frequency (shop most common categories first)
         return [cat.value for cat, count in category_counts.most_common()]
 
     def _get_storage_consideration(self, category: ItemCategory) -> str:
         """Get storage consideration for bulk buying."""
-        considerations = {
-            ItemCategory.FROZEN: "Ensure adequate freezer space",
-            ItemCategory.PRODUCE: "Check refrigerator space and freshness timeline",
-            ItemCategory.PANTRY: "Verify pantry storage and expiration dates",
-            ItemCategory.HOUSEHOLD: "No special storage requirements"
-        }
-        return considerations.get(category, "Consider available storage space")
+        return _STORAGE_CONSIDERATIONS.get(category, "Consider available storage space")
 
     def _get_expiration_consideration(self, category: ItemCategory) -> str:
         """Get expiration consideration for bulk buying."""
-        considerations = {
-            ItemCategory.FROZEN: "Long shelf life - safe for bulk buying",
-            ItemCategory.PRODUCE: "Short shelf life - buy only what you'll use",
-            ItemCategory.DAIRY_EGGS: "Medium shelf life - check expiration dates",
-            ItemCategory.PANTRY: "Long shelf life - ideal for bulk buying"
-        }
-        return considerations.get(category, "Check expiration dates before bulk buying")
+        return _EXPIRATION_CONSIDERATIONS.get(category, "Check expiration dates before bulk buying")
 
-    def _get_seasonal_produce_alternatives(self, item_name: str, season: str) -> List[Dict[str, Any]]:
+    def _get_seasonal_produce_alternatives(self, item_name: str, season: str) -> Tuple[Mapping[str, Any], ...]:
         """Get seasonal alternatives for produce items."""
-        seasonal_produce = {
-            'spring': [
-                {'name': 'asparagus', 'price_multiplier': 0.7, 'availability': 'peak', 'advantage': 'in season, 30% cheaper'},
-                {'name': 'strawberries', 'price_multiplier': 0.8, 'availability': 'peak', 'advantage': 'peak freshness, 20% cheaper'},
-                {'name': 'peas', 'price_multiplier': 0.9, 'availability': 'good', 'advantage': 'fresh and affordable'}
-            ],
-            'summer': [
-                {'name': 'tomatoes', 'price_multiplier': 0.6, 'availability': 'peak', 'advantage': 'peak season, 40% cheaper'},
-                {'name': 'corn', 'price_multiplier': 0.7, 'availability': 'peak', 'advantage': 'locally grown, 30% cheaper'},
-                {'name': 'berries', 'price_multiplier': 0.8, 'availability': 'peak', 'advantage': 'fresh and sweet'}
-            ],
-            'fall': [
-                {'name': 'apples', 'price_multiplier': 0.8, 'availability': 'peak', 'advantage': 'harvest season, 20% cheaper'},
-                {'name': 'squash', 'price_multiplier': 0.7, 'availability': 'peak', 'advantage': 'locally harvested'},
-                {'name': 'cranberries', 'price_multiplier': 0.9, 'availability': 'peak', 'advantage': 'fresh harvest'}
-            ],
-            'winter': [
-                {'name': 'citrus', 'price_multiplier': 0.8, 'availability': 'peak', 'advantage': 'winter season fruit'},
-                {'name': 'root vegetables', 'price_multiplier': 0.9, 'availability': 'good', 'advantage': 'storage crops'},
-                {'name': 'brussels sprouts', 'price_multiplier': 0.85, 'availability': 'good', 'advantage': 'cold weather crop'}
-            ]
-        }
-        
-        # Simple matching - in production would use more sophisticated NLP
-        alternatives = []
-        seasonal_items = seasonal_produce.get(season, [])
-        
-        for seasonal_item in seasonal_items:
-            if seasonal_item['name'].lower() in item_name.lower() or item_name.lower() in seasonal_item['name'].lower():
-                alternatives.append(seasonal_item)
-        
-        return alternatives
-
-    def _get_category_shopping_tips(self, category: ItemCategory) -> List[str]:
-        """Get shopping tips for specific categories."""
-        tips = {
-            ItemCategory.PRODUCE: [
-                "Shop for produce first to ensure freshness",
-                "Check for seasonal specials and local options"
-            ],
-            ItemCategory.MEAT_SEAFOOD: [
-                "Shop for meat and seafood after produce",
-                "Look for manager's specials near closing time"
-            ],
-            ItemCategory.FROZEN: [
-                "Shop for frozen items last to prevent thawing",
-                "Check for bulk deals on frozen vegetables"
-            ],
-            ItemCategory.PANTRY: [
-                "Stock up on non-perishables when on sale",
-                "Compare unit prices for best value"
-            ]
-        }
-        return tips.get(category, ["Compare prices and check expiration dates"])
+        return _match_seasonal_produce(season, item_name.lower())
+
+
+@cache
+def get_shopping_optimizer() -> ShoppingOptimizer:
+    """Shared optimizer instance, constructed on first use rather than at import."""
+    return ShoppingOptimizer()
 
 
-# Global instance
-shopping_optimizer = ShoppingOptimizer()
\ No newline at end of file
+def __getattr__(name: str):
+    # Keeps `from app.services.shopping_optimizer import shopping_optimizer` working lazily
+    if name == 'shopping_optimizer':
+        return get_shopping_optimizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
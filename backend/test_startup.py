@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Backend startup check - imports the application modules and reports any failures.
+"""
+
+import argparse
+import importlib
+import sys
+
+# Ordered cheapest first so a broken config surfaces before the heavy imports
+STARTUP_MODULES = (
+    "app.core.config",
+    "app.services.firebase_service",
+    "app.api.v1.auth",
+    "app.api.v1.recipes",
+    "app.api.v1.shopping_lists",
+    "app.api.v1.instagram",
+    "app.api.v1.ai",
+    "app.api.v1.multimodal_extraction",
+    "app.api.v1.proxy",
+    "app.main",
+)
+
+
+def check_imports(modules):
+    """Import each module independently and return the ones that failed"""
+    failed = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            print(f"✅ {name}")
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            failed.append(name)
+    return failed
+
+
+def check_app_creation():
+    """Check that the FastAPI app was built with its routes"""
+    from app.main import app
+    print(f"✅ Found {len(app.routes)} routes")
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Check that the backend imports cleanly")
+    parser.add_argument("--module", action="append", dest="modules",
+                        help="Only import the given module (can be repeated)")
+    parser.add_argument("--quick", action="store_true",
+                        help="Only import app.core.config")
+    args = parser.parse_args()
+
+    if args.modules:
+        modules = args.modules
+    elif args.quick:
+        modules = STARTUP_MODULES[:1]
+    else:
+        modules = STARTUP_MODULES
+
+    failed = check_imports(modules)
+    if "app.main" in modules and "app.main" not in failed:
+        check_app_creation()
+    if failed:
+        print(f"\n❌ {len(failed)} module(s) failed to import: {', '.join(failed)}")
+        return 1
+
+    print("\n✅ Backend startup check passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
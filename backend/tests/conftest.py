@@ -0,0 +1,6 @@
+import os
+
+# Required settings, so app modules import without a real .env
+os.environ.setdefault("FIREBASE_PROJECT_ID", "test-project")
+os.environ.setdefault("FIREBASE_CREDENTIALS_PATH", "test-credentials.json")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
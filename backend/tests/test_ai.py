@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.services.multimodal_ai_service import MultiModalAIService
+
+
+@pytest.fixture
+def service():
+    return MultiModalAIService()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ready quickly", 15),           # quick
+    ("simmering sauce", 45),         # simmer
+    ("roasted vegetables", 85),      # roast
+    ("plain toast", 25),
+])
+def test_complexity_time_matches_inflected_keywords(service, text, expected):
+    assert service._estimate_cooking_time_from_complexity(text) == expected
+
+
+def test_complexity_time_counts_each_indicator_once(service):
+    assert service._estimate_cooking_time_from_complexity("quick quick quick") == 15
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("roasted chilies", ["spicy"]),
+    ("no dairy-free cheese", ["vegan", "dairy-free"]),
+    ("meatless monday", ["vegetarian"]),
+])
+def test_dietary_detection_matches_substrings(service, text, expected):
+    assert asyncio.run(service._detect_dietary_info_advanced(text)) == expected
+
+
+@pytest.mark.parametrize("text, cuisine", [
+    ("crispy tacos", "mexican"),
+    ("turmeric-spiced rice", "indian"),
+    ("pasta with olive oil", "italian"),
+])
+def test_cuisine_tags_match_substrings(service, text, cuisine):
+    assert cuisine in service._generate_tags_advanced([], None, text)
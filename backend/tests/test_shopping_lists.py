@@ -0,0 +1,73 @@
+import pytest
+
+from app.services.shopping_list_service import ShoppingListService
+
+
+@pytest.fixture
+def service():
+    return ShoppingListService()
+
+
+def increments(updates):
+    return {path: increment.value for path, increment in updates.items()}
+
+
+def test_new_list_increments_stats(service):
+    after = {'status': 'active', 'items': [
+        {'name': 'Tomato', 'category': 'produce'},
+        {'name': 'Milk', 'category': 'dairy_eggs'},
+    ]}
+
+    assert increments(service._stats_increments(None, after)) == {
+        'total_lists': 1,
+        'active_lists': 1,
+        'total_items': 2,
+        'category_counts.produce': 1,
+        'category_counts.dairy_eggs': 1,
+    }
+
+
+def test_deleted_list_decrements_stats(service):
+    before = {'status': 'completed', 'items': [{'name': 'Eggs', 'category': 'dairy_eggs'}]}
+
+    assert increments(service._stats_increments(before, None)) == {
+        'total_lists': -1,
+        'completed_lists': -1,
+        'total_items': -1,
+        'category_counts.dairy_eggs': -1,
+    }
+
+
+def test_updated_list_applies_only_the_difference(service):
+    before = {'status': 'active', 'items': [
+        {'name': 'Tomato', 'category': 'produce'},
+        {'name': 'Milk', 'category': 'dairy_eggs'},
+    ]}
+    after = {'status': 'completed', 'items': [
+        {'name': 'Tomato', 'category': 'produce'},
+        {'name': 'Bread', 'category': 'bakery'},
+    ]}
+
+    assert increments(service._stats_increments(before, after)) == {
+        'active_lists': -1,
+        'completed_lists': 1,
+        'category_counts.dairy_eggs': -1,
+        'category_counts.bakery': 1,
+    }
+
+
+def test_uncategorized_item_counts_as_other(service):
+    after = {'status': 'active', 'items': [{'name': 'Salt', 'category': None}]}
+
+    assert increments(service._stats_increments(None, after)) == {
+        'total_lists': 1,
+        'active_lists': 1,
+        'total_items': 1,
+        'category_counts.other': 1,
+    }
+
+
+def test_unchanged_list_has_no_increments(service):
+    data = {'status': 'active', 'items': [{'name': 'Tomato', 'category': 'produce'}]}
+
+    assert service._stats_increments(data, dict(data)) == {}
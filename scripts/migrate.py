@@ -5,15 +5,12 @@ Database migration script for ForkFlix
 
 import os
 import sys
-import firebase_admin
-from firebase_admin import credentials, firestore
+from google.cloud import firestore
 
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
+    """Create a Firestore client from the service account key"""
     cred_path = os.path.join(os.path.dirname(__file__), '..', 'firebase', 'firebase-admin-key.json')
-    cred = credentials.Certificate(cred_path)
-    firebase_admin.initialize_app(cred)
-    return firestore.client()
+    return firestore.Client.from_service_account_json(cred_path)
 
 def create_indexes(db):
     """Create necessary Firestore indexes"""
@@ -27,11 +24,14 @@ def seed_data(db):
     
     # Add sample categories
     categories = ['Breakfast', 'Lunch', 'Dinner', 'Dessert', 'Snacks']
+    batch = db.batch()
+    collection = db.collection('categories')
     for category in categories:
-        db.collection('categories').add({
+        batch.set(collection.document(), {
             'name': category,
             'createdAt': firestore.SERVER_TIMESTAMP
         })
+    batch.commit()
     
     print("Initial data seeded successfully")
 
@@ -6,54 +6,86 @@ This script helps you set up the entire application with all required configurat
 
 import os
 import sys
+import argparse
+import re
 import json
+import shutil
 import asyncio
 import subprocess
+import tempfile
+import threading
+from functools import cached_property
 from pathlib import Path
 
 # Add parent directory to path to import setup_instagram_token
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Virtual environment layout differs on Windows
+_IS_WIN = os.name == 'nt'
+_VENV_BIN = "Scripts" if _IS_WIN else "bin"
+_PY_BIN = "python.exe" if _IS_WIN else "python"
+_PIP_BIN = "pip.exe" if _IS_WIN else "pip"
+
+_HF_KEY = re.compile(r'^HUGGINGFACE_API_KEY=.*$', re.MULTILINE)
+
+def _write_atomic(path, text):
+    """Write text to a temp file next to path and rename it into place"""
+    with tempfile.NamedTemporaryFile('w', dir=path.parent, delete=False) as tmp:
+        tmp.write(text)
+    os.replace(tmp.name, path)
+
 class SetupManager:
-    def __init__(self):
+    def __init__(self, args=None):
+        self.args = args or argparse.Namespace(skip_instagram=False, hf_key=None, non_interactive=False)
         self.project_root = Path(__file__).parent.parent
-        self.backend_dir = self.project_root / "backend"
-        self.frontend_dir = self.project_root / "frontend"
-        self.firebase_dir = self.project_root / "firebase"
-        
+    
+    @cached_property
+    def backend_dir(self):
+        return self.project_root / "backend"
+    
+    @cached_property
+    def frontend_dir(self):
+        return self.project_root / "frontend"
+    
+    @cached_property
+    def firebase_dir(self):
+        return self.project_root / "firebase"
+    
+    @cached_property
+    def venv_python(self):
+        return self.backend_dir / "venv" / _VENV_BIN / _PY_BIN
+    
+    @cached_property
+    def venv_pip(self):
+        return self.backend_dir / "venv" / _VENV_BIN / _PIP_BIN
+    
     def print_header(self, title):
         """Print a formatted header"""
-        print(f"\n{'='*60}")
-        print(f" {title}")
-        print(f"{'='*60}\n")
+        sys.stdout.write(f"\n{'='*60}\n {title}\n{'='*60}\n\n")
+        sys.stdout.flush()
     
     def print_step(self, step, description):
         """Print a formatted step"""
-        print(f"🔥 Step {step}: {description}")
-        print("-" * 50)
+        sys.stdout.write(f"🔥 Step {step}: {description}\n{'-' * 50}\n")
+        sys.stdout.flush()
     
     def check_requirements(self):
         """Check if required tools are installed"""
         self.print_step(1, "Checking Requirements")
         
-        requirements = {
-            "python": "python --version",
-            "node": "node --version",
-            "npm": "npm --version",
-            "git": "git --version"
-        }
-        
+        # A PATH lookup is enough to confirm each tool exists, no process spawn needed
         missing = []
-        for tool, command in requirements.items():
-            try:
-                result = subprocess.run(command.split(), capture_output=True, text=True)
-                if result.returncode == 0:
-                    print(f"✅ {tool}: {result.stdout.strip()}")
-                else:
-                    missing.append(tool)
-            except FileNotFoundError:
+        found = []
+        for tool in ("python", "node", "npm", "git"):
+            path = shutil.which(tool)
+            if path:
+                found.append(f"✅ {tool}: {path}\n")
+            else:
                 missing.append(tool)
         
+        sys.stdout.write("".join(found))
+        sys.stdout.flush()
+        
         if missing:
             print(f"\n❌ Missing required tools: {', '.join(missing)}")
             print("Please install them before continuing.")
@@ -62,32 +94,37 @@ class SetupManager:
         print("✅ All requirements satisfied!")
         return True
     
-    def setup_backend_dependencies(self):
+    async def _run_async(self, *command, cwd):
+        """Run a command without blocking the event loop, raising CalledProcessError on failure"""
+        proc = await asyncio.create_subprocess_exec(
+            *command, cwd=cwd,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, command, stdout, stderr)
+    
+    async def setup_backend_dependencies(self):
         """Install backend Python dependencies"""
         self.print_step(2, "Installing Backend Dependencies")
         
         try:
-            os.chdir(self.backend_dir)
-            
             # Check if virtual environment exists
             venv_path = self.backend_dir / "venv"
             if not venv_path.exists():
                 print("🔄 Creating virtual environment...")
-                subprocess.run([sys.executable, "-m", "venv", "venv"], check=True)
+                await self._run_async(sys.executable, "-m", "venv", "venv", cwd=self.backend_dir)
                 print("✅ Virtual environment created")
             
             # Install dependencies
-            if os.name == 'nt':  # Windows
-                pip_path = venv_path / "Scripts" / "pip"
-            else:  # Unix/Linux/Mac
-                pip_path = venv_path / "bin" / "pip"
-            
             print("🔄 Installing Python packages...")
-            subprocess.run([str(pip_path), "install", "-r", "requirements.txt"], check=True)
+            await self._run_async(str(self.venv_pip), "install", "-r", "requirements.txt",
+                                  cwd=self.backend_dir)
             print("✅ Backend dependencies installed")
             
         except subprocess.CalledProcessError as e:
             print(f"❌ Failed to install backend dependencies: {e}")
+            print(e.stderr.decode(errors="replace"))
             return False
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -95,18 +132,18 @@ class SetupManager:
         
         return True
     
-    def setup_frontend_dependencies(self):
+    async def setup_frontend_dependencies(self):
         """Install frontend Node.js dependencies"""
         self.print_step(3, "Installing Frontend Dependencies")
         
         try:
-            os.chdir(self.frontend_dir)
             print("🔄 Installing Node.js packages...")
-            subprocess.run(["npm", "install"], check=True)
+            await self._run_async("npm", "install", cwd=self.frontend_dir)
             print("✅ Frontend dependencies installed")
             
         except subprocess.CalledProcessError as e:
             print(f"❌ Failed to install frontend dependencies: {e}")
+            print(e.stderr.decode(errors="replace"))
             return False
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -173,7 +210,10 @@ class SetupManager:
         """Set up Instagram API credentials"""
         self.print_step(6, "Instagram API Configuration")
         
-        choice = input("Do you want to set up Instagram API now? (y/n): ").lower().strip()
+        if self.args.skip_instagram or self.args.non_interactive:
+            choice = 'n'
+        else:
+            choice = input("Do you want to set up Instagram API now? (y/n): ").lower().strip()
         if choice in ['y', 'yes']:
             try:
                 # Import and run the Instagram setup
@@ -197,24 +237,26 @@ class SetupManager:
         print("2. Create a new token (read access is sufficient)")
         print("3. Add it to backend/.env as HUGGINGFACE_API_KEY")
         
-        api_key = input("Enter your Hugging Face API key (or press Enter to skip): ").strip()
+        if self.args.hf_key is not None:
+            api_key = self.args.hf_key.strip()
+        elif self.args.non_interactive:
+            api_key = ""
+        else:
+            api_key = input("Enter your Hugging Face API key (or press Enter to skip): ").strip()
         
         if api_key:
             # Update .env file
             env_path = self.backend_dir / ".env"
             if env_path.exists():
                 env_content = env_path.read_text()
-                if "HUGGINGFACE_API_KEY=" in env_content:
-                    # Replace existing key
-                    lines = env_content.split('\n')
-                    for i, line in enumerate(lines):
-                        if line.startswith("HUGGINGFACE_API_KEY="):
-                            lines[i] = f"HUGGINGFACE_API_KEY={api_key}"
-                            break
-                    env_path.write_text('\n'.join(lines))
-                else:
+                # Replace existing key in a single pass over the file
+                env_content, replaced = _HF_KEY.subn(
+                    lambda _: f"HUGGINGFACE_API_KEY={api_key}", env_content, count=1
+                )
+                if not replaced:
                     # Add new key
-                    env_path.write_text(env_content + f"\nHUGGINGFACE_API_KEY={api_key}\n")
+                    env_content = env_content.rstrip() + f"\nHUGGINGFACE_API_KEY={api_key}\n"
+                _write_atomic(env_path, env_content)
                 
                 print("✅ Hugging Face API key saved")
             else:
@@ -229,25 +271,41 @@ class SetupManager:
         self.print_step(8, "Testing Backend")
         
         try:
-            os.chdir(self.backend_dir)
-            
-            # Run the test script
-            if os.name == 'nt':  # Windows
-                python_path = self.backend_dir / "venv" / "Scripts" / "python"
-            else:  # Unix/Linux/Mac
-                python_path = self.backend_dir / "venv" / "bin" / "python"
+            # Share one bytecode cache across runs and pre-compile the app once
+            env = {**os.environ, "PYTHONPYCACHEPREFIX": "/tmp/forkflix-pycache", "PYTHONDONTWRITEBYTECODE": ""}
+            subprocess.run([str(self.venv_python), "-m", "compileall", "-q", "-j", "0", "app"],
+                           cwd=self.backend_dir, env=env, capture_output=True)
             
             print("🔄 Running backend tests...")
-            result = subprocess.run([str(python_path), "test_startup.py"], 
-                                  capture_output=True, text=True, timeout=30)
+            # Stream the check's output as it runs instead of buffering it until exit
+            proc = subprocess.Popen([str(self.venv_python), "test_startup.py"],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True, bufsize=1, cwd=self.backend_dir,
+                                    env={**env, "PYTHONUNBUFFERED": "1"})
+            timed_out = threading.Event()
             
-            if result.returncode == 0:
+            def kill_on_timeout():
+                timed_out.set()
+                proc.kill()
+            
+            timer = threading.Timer(30, kill_on_timeout)
+            timer.start()
+            try:
+                for line in proc.stdout:
+                    sys.stdout.write(line)
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+                proc.stdout.close()
+            
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(proc.args, 30)
+            
+            if returncode == 0:
                 print("✅ Backend test passed")
-                print(result.stdout)
                 return True
             else:
                 print("❌ Backend test failed")
-                print(result.stderr)
                 return False
                 
         except subprocess.TimeoutExpired:
@@ -262,12 +320,12 @@ class SetupManager:
         self.print_step(9, "Testing Frontend")
         
         try:
-            os.chdir(self.frontend_dir)
             print("🔄 Testing frontend build...")
             
             # Try to build the frontend
             result = subprocess.run(["npm", "run", "build"], 
-                                  capture_output=True, text=True, timeout=120)
+                                  capture_output=True, text=True, timeout=120,
+                                  cwd=self.frontend_dir)
             
             if result.returncode == 0:
                 print("✅ Frontend build successful")
@@ -320,10 +378,12 @@ class SetupManager:
             if not self.check_requirements():
                 return False
             
-            if not self.setup_backend_dependencies():
-                return False
-            
-            if not self.setup_frontend_dependencies():
+            # pip and npm installs are independent, so run them side by side
+            backend_ok, frontend_ok = await asyncio.gather(
+                self.setup_backend_dependencies(),
+                self.setup_frontend_dependencies()
+            )
+            if not (backend_ok and frontend_ok):
                 return False
             
             if not self.setup_environment_files():
@@ -358,7 +418,13 @@ class SetupManager:
 
 async def main():
     """Main entry point"""
-    setup = SetupManager()
+    parser = argparse.ArgumentParser(description="Set up Recipe Reel Manager")
+    parser.add_argument("--skip-instagram", action="store_true",
+                        help="Skip the Instagram API setup step")
+    parser.add_argument("--hf-key", help="Hugging Face API key to save to backend/.env")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="Never prompt for input, skipping any step that would")
+    setup = SetupManager(parser.parse_args())
     success = await setup.run_setup()
     sys.exit(0 if success else 1)
 
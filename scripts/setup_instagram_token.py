@@ -4,11 +4,26 @@ Instagram Access Token Setup Script
 This script helps you generate a Facebook app access token for Instagram oEmbed API
 """
 
+from __future__ import annotations
+
 import asyncio
-import httpx
+import importlib.util
 import os
+import re
+import tempfile
+from typing import TYPE_CHECKING
 from urllib.parse import urlencode
 
+if TYPE_CHECKING:
+    import httpx
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# .env keys replaced by update_env_file
+_ENV_SKIP = re.compile(r'^(FACEBOOK_APP_(ID|SECRET|ACCESS_TOKEN)|INSTAGRAM_ACCESS_TOKEN)=')
+_ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend", ".env")
+
 def get_app_credentials():
     """Get Facebook app credentials from user input"""
     print("=== Instagram Access Token Setup ===")
@@ -27,105 +42,104 @@ def get_app_credentials():
     
     return app_id, app_secret
 
-async def generate_app_access_token(app_id: str, app_secret: str) -> str:
+async def generate_app_access_token(client: httpx.AsyncClient, app_id: str, app_secret: str) -> str:
     """Generate app access token using Facebook Graph API"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = "https://graph.facebook.com/oauth/access_token"
-            params = {
-                "client_id": app_id,
-                "client_secret": app_secret,
-                "grant_type": "client_credentials"
-            }
-            
-            print(f"🔄 Generating access token...")
-            response = await client.get(url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                access_token = data.get("access_token")
-                if access_token:
-                    print("✅ Access token generated successfully!")
-                    return access_token
-                else:
-                    print("❌ No access token in response")
-                    return None
+        url = "https://graph.facebook.com/oauth/access_token"
+        params = {
+            "client_id": app_id,
+            "client_secret": app_secret,
+            "grant_type": "client_credentials"
+        }
+        
+        print(f"🔄 Generating access token...")
+        response = await client.get(url, params=params)
+        
+        if response.status_code == 200:
+            data = response.json()
+            access_token = data.get("access_token")
+            if access_token:
+                print("✅ Access token generated successfully!")
+                return access_token
             else:
-                print(f"❌ Error: {response.status_code}")
-                try:
-                    error_data = response.json()
-                    print(f"Error details: {error_data}")
-                except:
-                    print(f"Response: {response.text}")
+                print("❌ No access token in response")
                 return None
-                
+        else:
+            print(f"❌ Error: {response.status_code}")
+            try:
+                error_data = response.json()
+                print(f"Error details: {error_data}")
+            except:
+                print(f"Response: {response.text}")
+            return None
+            
     except Exception as e:
         print(f"❌ Network error: {e}")
         return None
 
-async def test_access_token(access_token: str) -> bool:
+async def test_access_token(client: httpx.AsyncClient, access_token: str) -> bool:
     """Test the access token with a sample Instagram URL"""
     try:
-        async with httpx.AsyncClient() as client:
-            # Use a well-known public Instagram post for testing
-            test_url = "https://www.instagram.com/p/CK4tYUjF8VZ/"  # Sample public post
-            
-            url = "https://graph.facebook.com/v18.0/instagram_oembed"
-            params = {
-                "url": test_url,
-                "access_token": access_token,
-                "omitscript": False
-            }
-            
-            print(f"🔄 Testing access token...")
-            response = await client.get(url, params=params)
+        # Use a well-known public Instagram post for testing
+        test_url = "https://www.instagram.com/p/CK4tYUjF8VZ/"  # Sample public post
+        
+        url = "https://graph.facebook.com/v18.0/instagram_oembed"
+        params = {
+            "url": test_url,
+            "access_token": access_token,
+            "omitscript": False
+        }
+        
+        print(f"🔄 Testing access token...")
+        response = await client.get(url, params=params)
+        
+        if response.status_code == 200:
+            print("✅ Access token works correctly!")
+            return True
+        else:
+            print(f"⚠️ Test failed with status {response.status_code}")
+            try:
+                error_data = response.json()
+                print(f"Error details: {error_data}")
+            except:
+                print(f"Response: {response.text}")
+            return False
             
-            if response.status_code == 200:
-                print("✅ Access token works correctly!")
-                return True
-            else:
-                print(f"⚠️ Test failed with status {response.status_code}")
-                try:
-                    error_data = response.json()
-                    print(f"Error details: {error_data}")
-                except:
-                    print(f"Response: {response.text}")
-                return False
-                
     except Exception as e:
         print(f"❌ Test error: {e}")
         return False
 
-def update_env_file(app_id: str, app_secret: str, access_token: str):
+def _read_env_lines(env_path: str) -> list:
+    """Read the existing .env without the Instagram/Facebook entries"""
+    if not os.path.exists(env_path):
+        return []
+    with open(env_path, 'r') as f:
+        return [line for line in f if not _ENV_SKIP.match(line)]
+
+def update_env_file(app_id: str, app_secret: str, access_token: str, env_lines: list = None):
     """Update the .env file with the credentials"""
-    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend", ".env")
-    
-    # Read existing .env file
-    env_lines = []
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            env_lines = f.readlines()
+    env_path = _ENV_PATH
     
-    # Remove existing Instagram/Facebook entries
-    env_lines = [line for line in env_lines if not any(
-        key in line for key in [
-            'FACEBOOK_APP_ID=',
-            'FACEBOOK_APP_SECRET=',
-            'FACEBOOK_APP_ACCESS_TOKEN=',
-            'INSTAGRAM_ACCESS_TOKEN='
-        ]
-    )]
-    
-    # Add new entries
-    env_lines.append(f"\n# Instagram/Facebook Configuration\n")
-    env_lines.append(f"FACEBOOK_APP_ID={app_id}\n")
-    env_lines.append(f"FACEBOOK_APP_SECRET={app_secret}\n")
-    env_lines.append(f"FACEBOOK_APP_ACCESS_TOKEN={access_token}\n")
-    
-    # Write back to .env file
-    os.makedirs(os.path.dirname(env_path), exist_ok=True)
-    with open(env_path, 'w') as f:
-        f.writelines(env_lines)
+    # Stream the filtered .env into a temp file and swap it in atomically,
+    # so an interrupted write never leaves a truncated secrets file
+    env_dir = os.path.dirname(env_path)
+    os.makedirs(env_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=env_dir, delete=False) as tmp:
+        # Remove existing Instagram/Facebook entries, unless already read by the caller
+        if env_lines is not None:
+            tmp.writelines(env_lines)
+        elif os.path.exists(env_path):
+            with open(env_path, 'r') as f:
+                tmp.writelines(line for line in f if not _ENV_SKIP.match(line))
+        
+        # Add new entries
+        tmp.write(
+            f"\n# Instagram/Facebook Configuration\n"
+            f"FACEBOOK_APP_ID={app_id}\n"
+            f"FACEBOOK_APP_SECRET={app_secret}\n"
+            f"FACEBOOK_APP_ACCESS_TOKEN={access_token}\n"
+        )
+    os.replace(tmp.name, env_path)
     
     print(f"✅ Updated {env_path}")
 
@@ -138,21 +152,33 @@ async def main():
     if not app_id or not app_secret:
         return
     
-    # Generate access token
-    access_token = await generate_app_access_token(app_id, app_secret)
-    if not access_token:
-        print("\n❌ Failed to generate access token")
-        print("Please check your App ID and Secret are correct")
-        return
+    # Deferred so importing this module for its helpers doesn't load httpx
+    import httpx
+    
+    # Generate and test the token over one connection to graph.facebook.com
+    async with httpx.AsyncClient(
+        http2=_HTTP2_AVAILABLE,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=2)
+    ) as client:
+        access_token = await generate_app_access_token(client, app_id, app_secret)
+        if not access_token:
+            print("\n❌ Failed to generate access token")
+            print("Please check your App ID and Secret are correct")
+            return
+        
+        # Read the current .env while the token test is in flight
+        async with asyncio.TaskGroup() as tg:
+            test_task = tg.create_task(test_access_token(client, access_token))
+            env_lines_task = tg.create_task(asyncio.to_thread(_read_env_lines, _ENV_PATH))
     
-    # Test the token
-    if await test_access_token(access_token):
+    if test_task.result():
         print(f"\n📋 Your access token: {access_token}")
         
         # Ask if user wants to update .env file
         update_env = input("\nUpdate backend/.env file automatically? (y/n): ").lower().strip()
         if update_env in ['y', 'yes']:
-            update_env_file(app_id, app_secret, access_token)
+            update_env_file(app_id, app_secret, access_token, env_lines_task.result())
         else:
             print("\n📝 Add these to your backend/.env file:")
             print(f"FACEBOOK_APP_ID={app_id}")